@@ -0,0 +1,149 @@
+"""
+性能测试脚本，使用录制好的PNG帧在无游戏窗口的环境下运行
+用法：
+    python benchmark.py capture <帧文件夹> [次数]
+    python benchmark.py startup [模块名] [次数]
+    python benchmark.py route [次数]
+    python benchmark.py match <帧文件夹> [次数]
+"""
+import subprocess
+import sys
+import time
+
+from capture import Frame, ReplayCapture
+from constants import Setting
+
+
+def bench_capture(path: str, times: int = 100):
+    """
+    测量截图及通道转换的平均每帧耗时
+    :param path: PNG帧所在文件夹
+    :param times: 截图次数
+    """
+    capture = ReplayCapture(path)
+    start_time = time.perf_counter()
+    for _ in range(times):
+        Frame(capture.grab(Setting.screenWidth, Setting.screenHeight)).rgb
+    elapsed = (time.perf_counter() - start_time) / times
+    print(f"capture: {elapsed * 1000:.3f} ms/frame")
+
+
+def bench_startup(module: str = "page", times: int = 5):
+    """
+    测量在新进程中导入模块的平均耗时
+    :param module: 模块名
+    :param times: 测量次数
+    """
+    subprocess.run([sys.executable, "-c", f"import {module}"], check=True)  # 预热磁盘缓存
+    start_time = time.perf_counter()
+    for _ in range(times):
+        subprocess.run([sys.executable, "-c", f"import {module}"], check=True)
+    elapsed = (time.perf_counter() - start_time) / times
+    print(f"import {module}: {elapsed * 1000:.1f} ms")
+
+
+def find_path_legacy(dictPages: dict, pageName: str) -> list:
+    """
+    原递归寻路实现，从目标界面逐级查找第一个父界面，仅用于对比
+    """
+    route = []
+
+    def loop(pageName: str):
+        if pageName in dictPages:
+            route.append(pageName)
+            for modelPage in dictPages.values():
+                if any(modelPageRoute.pageName == pageName for modelPageRoute in modelPage.route):
+                    loop(modelPage.pageName)
+                    break
+
+    loop(pageName)
+    route.reverse()
+    return route
+
+
+def bench_route(times: int = 1000):
+    """
+    对比路径表查询与原递归寻路的耗时
+    :param times: 每个目标界面的寻路次数
+    """
+    from page import get_dictPages
+    from route import RouteTable
+
+    dictPages = get_dictPages()
+    listTarget = [pageName for pageName in dictPages if RouteTable(dictPages).find_path("主界面", pageName)]
+
+    start_time = time.perf_counter()
+    for _ in range(times):
+        for pageName in listTarget:
+            find_path_legacy(dictPages, pageName)
+    elapsedLegacy = (time.perf_counter() - start_time) / (times * len(listTarget))
+
+    start_time = time.perf_counter()
+    routeTable = RouteTable(dictPages)
+    elapsedBuild = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    for _ in range(times):
+        for pageName in listTarget:
+            routeTable.refresh(dictPages)
+            routeTable.find_path("主界面", pageName)
+    elapsedTable = (time.perf_counter() - start_time) / (times * len(listTarget))
+
+    for pageName in listTarget:
+        if find_path_legacy(dictPages, pageName) != routeTable.find_path("主界面", pageName):
+            print(f"路径不同：{pageName}")
+
+    print(f"route legacy: {elapsedLegacy * 1e6:.2f} us/lookup")
+    print(f"route table: {elapsedTable * 1e6:.2f} us/lookup (build {elapsedBuild * 1000:.3f} ms)")
+
+
+def bench_match(path: str, times: int = 10):
+    """
+    对比金字塔模板匹配与全图匹配的耗时，并检查两者找到的位置是否一致
+    :param path: PNG帧所在文件夹
+    :param times: 每帧每个模板的匹配次数
+    """
+    from template import match_exhaustive, match_pyramid, templateStore
+
+    capture = ReplayCapture(path)
+    templateStore.load()
+    listFrame = [Frame(bgra) for bgra in capture.listFrame]
+    listTemplate = list(templateStore.dictTemplate.values())
+
+    elapsedExhaustive = 0.0
+    elapsedPyramid = 0.0
+    for frame in listFrame:
+        for template in listTemplate:
+            start_time = time.perf_counter()
+            for _ in range(times):
+                confidence, x, y = match_exhaustive(Frame(frame.bgra).gray, template.gray)
+            elapsedExhaustive += time.perf_counter() - start_time
+
+            start_time = time.perf_counter()
+            for _ in range(times):
+                confidencePyramid, xPyramid, yPyramid = match_pyramid(Frame(frame.bgra), template)
+            elapsedPyramid += time.perf_counter() - start_time
+
+            if confidence >= Setting.threshold and (x, y) != (xPyramid, yPyramid):
+                print(f"位置不同：{template.name} 全图({x}, {y}) 金字塔({xPyramid}, {yPyramid})")
+
+    count = times * len(listFrame) * len(listTemplate)
+    print(f"match exhaustive: {elapsedExhaustive / count * 1000:.3f} ms/template")
+    print(f"match pyramid: {elapsedPyramid / count * 1000:.3f} ms/template")
+
+
+dictBench = {
+    "capture": bench_capture,
+    "startup": bench_startup,
+    "route": bench_route,
+    "match": bench_match,
+}
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] not in dictBench:
+        print(__doc__)
+        sys.exit(1)
+
+    args = [int(arg) if arg.isdigit() else arg for arg in sys.argv[2:]]
+    dictBench[sys.argv[1]](*args)
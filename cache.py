@@ -0,0 +1,221 @@
+import hashlib
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+from capture import Frame
+from constants import Setting
+
+
+def get_signature(image: np.ndarray, sideMax: int = 64) -> np.ndarray:
+    """
+    计算图像的缩略灰度签名
+    :param image: 截图帧，或RGB、灰度图像np数组
+    :param sideMax: 签名最长边像素数
+    :return: 缩略灰度图np数组
+    """
+    if isinstance(image, Frame):  # 直接由原始数据缩小，避免整帧转换通道
+        image = image.bgra
+    height, width = image.shape[:2]
+    ratio = min(1.0, sideMax / max(height, width, 1))
+    size = (max(1, int(width * ratio)), max(1, int(height * ratio)))
+    small = cv2.resize(image, size, interpolation=cv2.INTER_AREA)
+    if small.ndim == 3 and small.shape[2] == 4:
+        small = cv2.cvtColor(small, cv2.COLOR_BGRA2GRAY)
+    elif small.ndim == 3:
+        small = cv2.cvtColor(small, cv2.COLOR_RGB2GRAY)
+    return small.astype(np.int16)
+
+
+class ChangeDetector:
+    """
+    画面变化检测，区域画面与上一帧相比未变化时直接返回上次的识别结果
+    """
+
+    def __init__(self, threshold: float = None, limitHits: int = None):
+        """
+        :param threshold: 签名平均像素差阈值，低于该值视为未变化
+        :param limitHits: 连续命中次数上限，超过后强制重新识别
+        """
+        self.threshold = Setting.diffThreshold if threshold is None else threshold
+        self.limitHits = Setting.limitDiffHits if limitHits is None else limitHits
+        self.dictRegion = {}  # 键为区域名，值为[签名, 识别结果, 连续命中次数]
+        self.hits = 0  # 命中次数
+        self.misses = 0  # 未命中次数
+
+    def lookup(self, key: str, image: np.ndarray) -> tuple:
+        """
+        查询区域画面是否未变化
+        :param key: 区域名
+        :param image: 区域图像
+        :return: (是否命中, 缓存的识别结果)
+        """
+        signature = get_signature(image)
+        record = self.dictRegion.get(key)
+        if (
+            record and
+            record[0].shape == signature.shape and
+            record[2] < self.limitHits and
+            np.mean(np.abs(record[0] - signature)) < self.threshold
+        ):  # 画面未变化
+            record[2] += 1
+            self.hits += 1
+            return True, record[1]
+
+        self.misses += 1
+        return False, None
+
+    def store(self, key: str, image: np.ndarray, result):
+        """
+        缓存区域画面及其识别结果
+        :param key: 区域名
+        :param image: 区域图像
+        :param result: 识别结果
+        """
+        self.dictRegion[key] = [get_signature(image), result, 0]
+
+    def recognize(self, key: str, image: np.ndarray, func):
+        """
+        画面未变化时返回缓存结果，否则调用识别函数并缓存
+        :param key: 区域名
+        :param image: 区域图像
+        :param func: 识别函数，参数为图像
+        :return: 识别结果
+        """
+        boolHit, result = self.lookup(key, image)
+        if boolHit:
+            return result
+
+        result = func(image)
+        self.store(key, image, result)
+        return result
+
+    def reset(self, key: str = None):
+        """
+        清除缓存的区域画面
+        :param key: 区域名，为空时清除全部
+        """
+        if key is None:
+            self.dictRegion = {}
+        else:
+            self.dictRegion.pop(key, None)
+
+    def __str__(self):
+        total = self.hits + self.misses
+        rate = self.hits / total if total else 0
+        return f"画面变化检测 命中：{self.hits}，未命中：{self.misses}，命中率：{rate:.2%}"
+
+
+def hash_exact(image: np.ndarray) -> bytes:
+    """
+    像素完全一致的哈希
+    :param image: 图像np数组
+    :return: 哈希值
+    """
+    image = np.ascontiguousarray(image)  # 连续数组直接读取内存，不产生拷贝
+    digest = hashlib.blake2b(image.data, digest_size=16)
+    digest.update(str(image.shape).encode())
+    return digest.digest()
+
+
+def hash_perceptual(image: np.ndarray) -> bytes:
+    """
+    感知哈希（dHash），画面细微差异不影响哈希值
+    :param image: 图像np数组
+    :return: 哈希值
+    """
+    small = get_signature(image, sideMax=64)
+    small = cv2.resize(small.astype(np.uint8), (17, 16), interpolation=cv2.INTER_AREA)
+    bits = np.packbits(small[:, 1:] > small[:, :-1])
+    return bits.tobytes() + str(image.shape[:2]).encode()
+
+
+class OCRCache:
+    """
+    OCR识别结果缓存，以图像像素哈希为键，按最近最少使用淘汰
+    """
+
+    def __init__(self, mode: str = None, limitSize: int = None, limitMemory: int = None):
+        """
+        :param mode: 哈希方式，完全一致exact或感知哈希perceptual
+        :param limitSize: 缓存条目数上限
+        :param limitMemory: 缓存估算内存上限（字节）
+        """
+        self.mode = Setting.ocrCacheMode if mode is None else mode
+        self.limitSize = Setting.ocrCacheSize if limitSize is None else limitSize
+        self.limitMemory = Setting.ocrCacheMemory if limitMemory is None else limitMemory
+        self.dictResult = OrderedDict()  # 键为哈希值，值为(识别结果, 估算内存)
+        self.memory = 0  # 当前估算内存
+        self.hits = 0  # 命中次数
+        self.misses = 0  # 未命中次数
+        self.evictions = 0  # 淘汰次数
+
+    def get_key(self, image) -> bytes:
+        """
+        计算图像的缓存键
+        """
+        if isinstance(image, Frame):
+            image = image.bgra
+
+        if self.mode == "perceptual":
+            return hash_perceptual(image)
+        return hash_exact(image)
+
+    @staticmethod
+    def get_memory(key: bytes, result) -> int:
+        """
+        估算缓存条目占用的内存
+        """
+        memory = len(key) + 64
+        if result:
+            memory += result.arrBox.nbytes + sum(64 + len(text) * 4 for text in result.listText)
+        return memory
+
+    def recognize(self, image, func):
+        """
+        命中缓存时返回缓存结果，否则调用识别函数并缓存
+        :param image: 截图帧或图像np数组
+        :param func: 识别函数，参数为图像
+        :return: 识别结果
+        """
+        if self.limitSize <= 0:  # 关闭缓存
+            return func(image)
+
+        key = self.get_key(image)
+        if key in self.dictResult:
+            self.dictResult.move_to_end(key)
+            self.hits += 1
+            return self.dictResult[key][0]  # 识别结果不可变，直接返回
+
+        self.misses += 1
+        result = func(image)
+        memory = self.get_memory(key, result)
+        self.dictResult[key] = (result, memory)
+        self.memory += memory
+
+        # 超出条目数或内存上限时淘汰最久未使用的结果
+        while len(self.dictResult) > self.limitSize or self.memory > self.limitMemory:
+            _, (_, memoryEvicted) = self.dictResult.popitem(last=False)
+            self.memory -= memoryEvicted
+            self.evictions += 1
+
+        return result
+
+    def clear(self):
+        """
+        清空缓存
+        """
+        self.dictResult = OrderedDict()
+        self.memory = 0
+
+    def __str__(self):
+        total = self.hits + self.misses
+        rate = self.hits / total if total else 0
+        return (
+            f"OCR缓存 命中：{self.hits}，未命中：{self.misses}，命中率：{rate:.2%}，"
+            f"淘汰：{self.evictions}，条目：{len(self.dictResult)}，内存：{self.memory}B"
+        )
+
+
+ocrCache = OCRCache()
@@ -0,0 +1,299 @@
+import os
+import threading
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+from constants import Setting
+
+
+def clip_region(pos, width: int, height: int, x: int = 0, y: int = 0) -> tuple:
+    """
+    将位置模型限制在画面范围内
+    :param pos: 位置模型
+    :param width: 画面宽度
+    :param height: 画面高度
+    :param x: 画面左上角横坐标，位置模型将换算为相对该点的坐标
+    :param y: 画面左上角纵坐标
+    :return: 区域坐标元组(x1, y1, x2, y2)
+    """
+    x1 = min(max(int(pos.x1) - x, 0), width)
+    y1 = min(max(int(pos.y1) - y, 0), height)
+    x2 = min(max(int(pos.x2) - x, x1), width)
+    y2 = min(max(int(pos.y2) - y, y1), height)
+    return x1, y1, x2, y2
+
+
+class Frame:
+    """
+    截图帧，保存原始BGRA数据，RGB与灰度视图按需生成且每帧最多计算一次
+    """
+
+    def __init__(self, bgra: np.ndarray, x: int = 0, y: int = 0):
+        """
+        :param bgra: BGRA图像np数组
+        :param x: 帧左上角在画面中的横坐标
+        :param y: 帧左上角在画面中的纵坐标
+        """
+        self.bgra = bgra
+        self.x = x
+        self.y = y
+        self.__rgb = None
+        self.__gray = None
+        self.__dictPyramid = {}  # 键为金字塔层数，值为缩小后的灰度图
+
+    @property
+    def shape(self) -> tuple:
+        return self.bgra.shape[:2]
+
+    @property
+    def rgb(self) -> np.ndarray:
+        """
+        RGB视图
+        """
+        if self.__rgb is None:
+            self.__rgb = cv2.cvtColor(self.bgra, cv2.COLOR_BGRA2RGB)
+        return self.__rgb
+
+    @property
+    def gray(self) -> np.ndarray:
+        """
+        灰度视图
+        """
+        if self.__gray is None:
+            self.__gray = cv2.cvtColor(self.bgra, cv2.COLOR_BGRA2GRAY)
+        return self.__gray
+
+    def pyramid(self, level: int) -> np.ndarray:
+        """
+        缩小2^level倍的灰度图，直接由原始数据缩小后再转换通道
+        :param level: 金字塔层数
+        """
+        if level not in self.__dictPyramid:
+            ratio = 1 / 2 ** level
+            small = cv2.resize(self.bgra, None, fx=ratio, fy=ratio, interpolation=cv2.INTER_AREA)
+            self.__dictPyramid[level] = cv2.cvtColor(small, cv2.COLOR_BGRA2GRAY)
+        return self.__dictPyramid[level]
+
+    def crop(self, pos) -> "Frame":
+        """
+        截取子区域，不复制像素，已计算的视图一并截取
+        :param pos: 位置模型，坐标为整个画面中的坐标
+        :return: 子区域帧
+        """
+        height, width = self.shape
+        x1, y1, x2, y2 = clip_region(pos, width, height, self.x, self.y)
+        if (x1, y1, x2, y2) == (0, 0, width, height):
+            return self
+
+        frame = Frame(self.bgra[y1:y2, x1:x2], self.x + x1, self.y + y1)
+        if self.__rgb is not None:
+            frame.__rgb = self.__rgb[y1:y2, x1:x2]
+        if self.__gray is not None:
+            frame.__gray = self.__gray[y1:y2, x1:x2]
+        return frame
+
+
+class CaptureBackend:
+    """
+    截图后端接口，grab返回BGRA格式的np数组
+    """
+
+    def grab(self, width: int, height: int, pos=None) -> np.ndarray:
+        """
+        截取一帧
+        :param width: 画面宽度
+        :param height: 画面高度
+        :param pos: 位置模型，传入时只截取该区域
+        :return: BGRA图像np数组
+        """
+        raise NotImplementedError
+
+    def release(self):
+        """
+        释放截图资源
+        """
+        pass
+
+
+class WindowCapture(CaptureBackend):
+    """
+    基于PrintWindow的窗口截图，窗口DC与位图按窗口和尺寸缓存复用，仅在尺寸变化时重建
+    """
+
+    def __init__(self, hwnd, limitRegion: int = None):
+        """
+        :param hwnd: 窗口句柄
+        :param limitRegion: 区域截图缓存的DC与位图数量上限
+        """
+        self.hwnd = hwnd  # 窗口句柄
+        self.limitRegion = Setting.limitCaptureRegions if limitRegion is None else limitRegion
+        self.size = None  # 当前位图尺寸
+        self.hwndDC = None  # 窗口设备上下文
+        self.mfcDC = None
+        self.saveDC = None
+        self.saveBitMap = None
+        self.printWindow = None
+        self.dictRegion = OrderedDict()  # 区域截图用的DC与位图，键为区域尺寸，按最近使用排序
+        self.lock = threading.Lock()  # 截图资源可能被流水线线程同时使用
+
+    def __build(self, width: int, height: int):
+        """
+        创建窗口DC、兼容DC与位图
+        """
+        from ctypes import windll
+
+        import win32gui
+        import win32ui
+
+        self.printWindow = windll.user32.PrintWindow
+        self.hwndDC = win32gui.GetWindowDC(self.hwnd)  # 获取窗口设备上下文（DC）
+        self.mfcDC = win32ui.CreateDCFromHandle(self.hwndDC)  # 创建mfcDC
+        self.saveDC = self.mfcDC.CreateCompatibleDC()  # 创建与mfcDC兼容的DC
+        self.saveBitMap = win32ui.CreateBitmap()  # 创建一个位图对象
+        self.saveBitMap.CreateCompatibleBitmap(self.mfcDC, width, height)  # 创建与mfcDC兼容的位图
+        self.saveDC.SelectObject(self.saveBitMap)  # 选择saveDC的位图对象，准备绘图
+        self.size = (width, height)
+
+    def __get_region(self, width: int, height: int) -> tuple:
+        """
+        获取指定尺寸的区域DC与位图，不存在时创建，超出数量上限时释放最久未使用的
+        """
+        key = (width, height)
+        if key in self.dictRegion:
+            self.dictRegion.move_to_end(key)
+            return self.dictRegion[key]
+
+        import win32gui
+        import win32ui
+
+        while self.dictRegion and len(self.dictRegion) >= self.limitRegion:
+            _, (regionDC, regionBitMap) = self.dictRegion.popitem(last=False)
+            win32gui.DeleteObject(regionBitMap.GetHandle())
+            regionDC.DeleteDC()
+
+        regionDC = self.mfcDC.CreateCompatibleDC()
+        regionBitMap = win32ui.CreateBitmap()
+        regionBitMap.CreateCompatibleBitmap(self.mfcDC, width, height)
+        regionDC.SelectObject(regionBitMap)
+        self.dictRegion[key] = (regionDC, regionBitMap)
+        return self.dictRegion[key]
+
+    def grab(self, width: int, height: int, pos=None) -> np.ndarray:
+        with self.lock:
+            return self.__grab(width, height, pos)
+
+    def __grab(self, width: int, height: int, pos=None) -> np.ndarray:
+        if self.size != (width, height):  # 首次截图或窗口尺寸变化
+            self.release()
+            self.__build(width, height)
+
+        # 尝试使用PrintWindow函数截取窗口图像
+        self.printWindow(self.hwnd, self.saveDC.GetSafeHdc(), 3)
+
+        bitMap = self.saveBitMap
+        if pos is not None:  # 只将目标区域拷贝出来，避免读取整幅位图
+            import win32con
+
+            x1, y1, x2, y2 = clip_region(pos, width, height)
+            if x2 == x1 or y2 == y1:
+                return np.zeros((y2 - y1, x2 - x1, 4), dtype=np.uint8)
+
+            regionDC, bitMap = self.__get_region(x2 - x1, y2 - y1)
+            regionDC.BitBlt((0, 0), (x2 - x1, y2 - y1), self.saveDC, (x1, y1), win32con.SRCCOPY)
+
+        # 从位图中获取图像数据
+        bmp_info = bitMap.GetInfo()  # 获取位图信息
+        bmp_str = bitMap.GetBitmapBits(True)  # 获取位图数据
+        im = np.frombuffer(bmp_str, dtype="uint8")  # 将位图数据转换为numpy数组
+        im.shape = (bmp_info["bmHeight"], bmp_info["bmWidth"], 4)  # 设置数组形状
+        return im
+
+    def release(self):
+        if not self.size:
+            return
+
+        import win32gui
+
+        # 清理资源
+        for regionDC, regionBitMap in self.dictRegion.values():
+            win32gui.DeleteObject(regionBitMap.GetHandle())
+            regionDC.DeleteDC()
+        self.dictRegion = OrderedDict()
+
+        win32gui.DeleteObject(self.saveBitMap.GetHandle())
+        self.saveDC.DeleteDC()
+        self.mfcDC.DeleteDC()
+        win32gui.ReleaseDC(self.hwnd, self.hwndDC)
+        self.size = None
+
+    def __del__(self):
+        try:
+            self.release()
+        except Exception:
+            pass
+
+
+class ReplayCapture(CaptureBackend):
+    """
+    回放截图，按顺序循环读取录制好的PNG帧，用于在无游戏窗口的环境下测试截图与识别流程
+    """
+
+    def __init__(self, path: str, preload: bool = True):
+        """
+        :param path: PNG帧所在文件夹或单个PNG文件
+        :param preload: 是否预先将所有帧读入内存
+        """
+        if os.path.isdir(path):
+            self.listPath = sorted(
+                os.path.join(path, fileName) for fileName in os.listdir(path)
+                if fileName.lower().endswith(".png")
+            )
+        else:
+            self.listPath = [path]
+
+        if not self.listPath:
+            raise FileNotFoundError(f"未找到回放帧：{path}")
+
+        self.listFrame = [self.__load(p) for p in self.listPath] if preload else None
+        self.index = 0  # 下一帧序号
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def __load(path: str) -> np.ndarray:
+        """
+        读取PNG帧并转换为BGRA格式
+        """
+        img = cv2.imdecode(np.fromfile(path, dtype=np.uint8), cv2.IMREAD_UNCHANGED)  # 兼容中文路径
+        if img is None:
+            raise FileNotFoundError(f"无法读取回放帧：{path}")
+
+        if img.ndim == 2:
+            return cv2.cvtColor(img, cv2.COLOR_GRAY2BGRA)
+        if img.shape[2] == 3:
+            return cv2.cvtColor(img, cv2.COLOR_BGR2BGRA)
+        return img
+
+    def grab(self, width: int, height: int, pos=None) -> np.ndarray:
+        with self.lock:
+            index = self.index
+            self.index = (self.index + 1) % len(self.listPath)
+
+        if self.listFrame is not None:
+            im = self.listFrame[index]
+        else:
+            im = self.__load(self.listPath[index])
+
+        # 与窗口截图一致，画面超出位图的部分被裁去，不足的部分补黑
+        if im.shape[0] < height or im.shape[1] < width:
+            canvas = np.zeros((height, width, 4), dtype=np.uint8)
+            canvas[:im.shape[0], :im.shape[1]] = im[:height, :width]
+            im = canvas
+
+        if pos is not None:
+            x1, y1, x2, y2 = clip_region(pos, width, height)
+            return im[y1:y2, x1:x2]
+
+        return im[:height, :width]
+
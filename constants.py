@@ -7,6 +7,29 @@ class Setting:
     """
     titleBarHeight = 58  # 标题栏高度
     threshold = 0.8  # 识别置信度阈值
+    diffThreshold = 1.5  # 画面变化阈值，缩略图平均像素差低于该值视为未变化
+    limitDiffHits = 20  # 画面未变化时连续复用识别结果的次数上限
+    digitThreshold = 0.05  # 数字模板识别阈值，字符与模板的均方差高于该值视为无法识别
+    fingerprintThreshold = 0.95  # 页面指纹相关系数阈值
+    fingerprintMargin = 0.03  # 页面指纹最相似与次相似页面的相关系数差下限，低于该值时使用OCR确认
+    defaultEdgeCost = 2.0  # 无实测数据时页面切换的默认耗时（秒）
+    pollIntervalMin = 0.05  # 等待界面时的最短轮询间隔（秒）
+    pollIntervalMax = 1.0  # 等待界面时的最长轮询间隔（秒）
+    pollFactor = 1.5  # 界面未出现时轮询间隔的增长倍数
+    timeoutWait = 120  # 等待界面的默认超时时间（秒）
+    timeoutBattle = 900  # 等待战斗结束的超时时间（秒）
+    pyramidLevel = 2  # 模板匹配时粗匹配的缩小层数，每层缩小一半，为0时直接全分辨率匹配
+    pyramidSlack = 0.2  # 粗匹配相关系数低于阈值减去该值时直接判定模板不在画面中
+    verifyMargin = 16  # 验证模板缓存位置时窗口向四周扩展的像素数
+    flushInterval = 5.0  # 后台写入已记录位置与统计数据的间隔（秒）
+    intervalTask = 3600 * 4  # 任务完成后再次执行的默认间隔（秒）
+    intervalRetry = 600  # 任务执行失败后重试的间隔（秒）
+    limitCaptureRegions = 8  # 区域截图缓存的DC与位图数量上限，超出时释放最久未使用的
+    boolRecCls = False  # 仅识别模式下是否进行方向分类
+    ocrWorkers = 0  # 流水线识别进程数，为0时不启用流水线
+    ocrCacheMode = "exact"  # OCR缓存键的哈希方式，完全一致exact或感知哈希perceptual
+    ocrCacheSize = 256  # OCR缓存条目数上限，为0时关闭缓存
+    ocrCacheMemory = 8 * 1024 * 1024  # OCR缓存估算内存上限（字节）
     dictTemplatePath = {
         "返回主界面_黑": "template/return_black.png",
         "返回主界面_白": "template/return_white.png",
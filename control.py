@@ -11,6 +11,7 @@ from utils import PositionModel
 class Control:
     def __init__(self, windowPosition):
         self.windowPosition = windowPosition
+        self.timeAction = 0.0  # 最近一次点击的时间戳
 
     def click(self, x: int = 0, y: int = 0):
         x = x + self.windowPosition[0]
@@ -20,6 +21,7 @@ class Control:
         win32api.mouse_event(win32con.MOUSEEVENTF_LEFTDOWN, x, y, 0, 0)
         time.sleep(0.1)
         win32api.mouse_event(win32con.MOUSEEVENTF_LEFTUP, x, y, 0, 0)
+        self.timeAction = time.time()
 
     def random_click(self, pos: PositionModel):
         """
@@ -58,6 +60,7 @@ class Control:
         x = x + self.windowPosition[0]
         y = y + self.windowPosition[1]
         win32api.mouse_event(win32con.MOUSEEVENTF_LEFTUP, x, y, 0, 0)
+        self.timeAction = time.time()
 
     def mouse_move(self, x: int = 0, y: int = 0, offset=(0, 0), duration: float = 0.01):
         # 计算移动的总距离和步数
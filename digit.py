@@ -0,0 +1,163 @@
+import io
+import os
+import threading
+
+import cv2
+import numpy as np
+
+from capture import Frame
+from constants import Setting
+from persist import write_atomic, writeBehind
+
+
+class DigitRecognizer:
+    """
+    数字模板识别，将区域按列切分为单个字符，与学习到的字符模板比对
+    模板由OCR识别结果自举：字符数与OCR文本长度一致时按位学习
+    """
+    version = 2  # 字符归一化方式版本，变化后旧模板作废
+
+    def __init__(self, path: str = "json/digit/templates.npz", size: tuple = (12, 20), chars: str = "0123456789/"):
+        """
+        :param path: 模板文件路径
+        :param size: 字符归一化尺寸(宽, 高)
+        :param chars: 可学习的字符，OCR文本含其他字符时不学习
+        """
+        self.path = path
+        self.size = size
+        self.chars = chars
+        self.listChar = []  # 模板对应的字符
+        self.arrSum = np.zeros((0, size[0] * size[1]), dtype=np.float32)  # 各字符样本之和
+        self.arrCount = np.zeros(0, dtype=np.float32)  # 各字符样本数
+        self.arrTemplate = self.arrSum  # 字符模板，为样本均值
+        self.hits = 0  # 模板识别成功次数
+        self.misses = 0  # 模板识别失败次数
+        self.lock = threading.Lock()  # 后台写入时保护模板
+        self.load()
+
+    def load(self):
+        """
+        读取模板文件
+        """
+        if not os.path.exists(self.path):
+            return
+
+        data = np.load(self.path)
+        if (
+            "version" not in data or int(data["version"]) != self.version or
+            data["sum"].shape[1] != self.size[0] * self.size[1]
+        ):  # 归一化方式或尺寸已变化
+            return
+
+        self.listChar = [str(char) for char in data["char"]]
+        self.arrSum = data["sum"].astype(np.float32)
+        self.arrCount = data["count"].astype(np.float32)
+        self.arrTemplate = self.arrSum / self.arrCount[:, None]
+
+    def save(self):
+        """
+        写入模板文件
+        """
+        buffer = io.BytesIO()
+        with self.lock:
+            np.savez(
+                buffer, version=self.version, char=np.array(self.listChar), sum=self.arrSum, count=self.arrCount
+            )
+        write_atomic(self.path, buffer.getvalue())
+
+    def split(self, image) -> np.ndarray:
+        """
+        将区域切分为字符并归一化，字符保留在整行中的高度与宽高比，使"1"、"/"、"-"等窄字符可区分
+        :param image: 截图帧或灰度图像np数组
+        :return: 字符向量数组，形状为(字符数, 宽*高)
+        """
+        gray = image.gray if isinstance(image, Frame) else image
+        if gray.size == 0:
+            return np.zeros((0, self.size[0] * self.size[1]), dtype=np.float32)
+
+        _, binary = cv2.threshold(gray, 0, 1, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+        if binary.mean() > 0.5:  # 保证文字为前景
+            binary = 1 - binary
+
+        # 按整行文字的上下边界裁剪，各字符共用同一高度
+        rows = np.flatnonzero(binary.any(axis=1))
+        if not rows.size:
+            return np.zeros((0, self.size[0] * self.size[1]), dtype=np.float32)
+        binary = binary[rows[0]:rows[-1] + 1]
+
+        # 按列投影切分字符，居中填充至归一化尺寸的宽高比后缩放
+        columns = np.concatenate(([0], binary.any(axis=0).astype(np.int8), [0]))
+        edges = np.flatnonzero(np.diff(columns))
+        listGlyph = []
+        for x1, x2 in zip(edges[::2], edges[1::2]):
+            glyph = binary[:, x1:x2]
+            height, width = glyph.shape
+            padX = max(round(height * self.size[0] / self.size[1]) - width, 0)
+            padY = max(round(width * self.size[1] / self.size[0]) - height, 0)
+            glyph = cv2.copyMakeBorder(
+                glyph, padY // 2, padY - padY // 2, padX // 2, padX - padX // 2, cv2.BORDER_CONSTANT, value=0
+            )
+            glyph = cv2.resize(glyph.astype(np.float32), self.size, interpolation=cv2.INTER_AREA)
+            listGlyph.append(glyph.ravel())
+
+        if not listGlyph:
+            return np.zeros((0, self.size[0] * self.size[1]), dtype=np.float32)
+        return np.stack(listGlyph)
+
+    def read(self, image):
+        """
+        识别区域内的字符
+        :param image: 截图帧或灰度图像np数组
+        :return: 识别出的文本，存在无法匹配的字符时返回None
+        """
+        arrGlyph = self.split(image)
+        if not len(self.listChar) or not len(arrGlyph):
+            self.misses += 1
+            return None
+
+        # 所有字符与所有模板的均方差
+        distance = (
+            (arrGlyph ** 2).sum(axis=1)[:, None]
+            + (self.arrTemplate ** 2).sum(axis=1)[None, :]
+            - 2 * arrGlyph @ self.arrTemplate.T
+        ) / arrGlyph.shape[1]
+        indexBest = distance.argmin(axis=1)
+        if distance[np.arange(len(indexBest)), indexBest].max() > Setting.digitThreshold:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return "".join(self.listChar[index] for index in indexBest)
+
+    def learn(self, image, text: str) -> bool:
+        """
+        由OCR识别结果学习字符模板
+        :param image: 截图帧或灰度图像np数组，需与text为同一区域
+        :param text: OCR识别出的文本
+        :return: 是否学习成功
+        """
+        text = text.replace(" ", "")
+        if not text or any(char not in self.chars for char in text):  # 只学习数字等计数字符
+            return False
+
+        arrGlyph = self.split(image)
+        if len(arrGlyph) != len(text):  # 切分结果与文本不对应
+            return False
+
+        with self.lock:
+            for char, glyph in zip(text, arrGlyph):
+                if char in self.listChar:
+                    index = self.listChar.index(char)
+                    self.arrSum[index] += glyph
+                    self.arrCount[index] += 1
+                else:
+                    self.listChar.append(char)
+                    self.arrSum = np.vstack((self.arrSum, glyph))
+                    self.arrCount = np.append(self.arrCount, 1)
+
+            self.arrTemplate = self.arrSum / self.arrCount[:, None]
+        writeBehind.mark(self.path, self.save)
+        return True
+
+
+digitRecognizer = DigitRecognizer()
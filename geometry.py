@@ -0,0 +1,102 @@
+import numpy as np
+
+from utils import PositionModel
+
+
+class Rect:
+    """
+    轻量位置，属性与PositionModel一致，用于识别流程内部，存储与序列化时再转换为PositionModel
+    """
+    __slots__ = ("x1", "y1", "x2", "y2")
+
+    def __init__(self, x1: int, y1: int, x2: int, y2: int):
+        self.x1 = x1
+        self.y1 = y1
+        self.x2 = x2
+        self.y2 = y2
+
+    def to_model(self) -> PositionModel:
+        """
+        转换为位置模型
+        """
+        return PositionModel(x1=self.x1, y1=self.y1, x2=self.x2, y2=self.y2)
+
+    def __eq__(self, other):
+        if not hasattr(other, "x2"):
+            return NotImplemented
+        return (self.x1, self.y1, self.x2, self.y2) == (other.x1, other.y1, other.x2, other.y2)
+
+    def __str__(self):
+        return f"({self.x1}, {self.y1}, {self.x2}, {self.y2})"
+
+    def __repr__(self):
+        return f"Rect{self}"
+
+
+class TextBox:
+    """
+    轻量文本结果，属性与TextModel一致
+    """
+    __slots__ = ("text", "pos")
+
+    def __init__(self, text: str, pos: Rect):
+        self.text = text
+        self.pos = pos
+
+    def __str__(self):
+        return f"文本：{self.text}, 位置：{self.pos}"
+
+    def __repr__(self):
+        return f"TextBox({self.text!r}, {self.pos!r})"
+
+
+class TextBoxes:
+    """
+    一次识别的全部文本结果，文本框坐标存于形状为(n, 4)的数组中，整体平移只需一次向量加法
+    迭代与索引时按需生成TextBox
+    """
+    __slots__ = ("listText", "arrBox")
+
+    def __init__(self, listText: list, arrBox: np.ndarray):
+        """
+        :param listText: 文本列表
+        :param arrBox: 文本框坐标数组，每行为(x1, y1, x2, y2)
+        """
+        self.listText = listText
+        self.arrBox = arrBox
+
+    @classmethod
+    def from_ocr(cls, listResults: list, threshold: float) -> "TextBoxes":
+        """
+        由OCR引擎的识别结果构建，过滤置信度不足的结果
+        :param listResults: (文本框四点坐标, 文本, 置信度)列表
+        :param threshold: 置信度阈值
+        """
+        listResults = [result for result in listResults if result[2] > threshold]
+        listText = [result[1] for result in listResults]
+        if not listResults:
+            return cls(listText, np.zeros((0, 4), dtype=np.int32))
+
+        arrPoint = np.asarray([result[0] for result in listResults], dtype=np.float32)  # (n, 4, 2)
+        arrBox = np.concatenate((arrPoint[:, 0], arrPoint[:, 2]), axis=1).astype(np.int32)
+        return cls(listText, arrBox)
+
+    def offset(self, x: int, y: int) -> "TextBoxes":
+        """
+        平移所有文本框
+        :return: 平移后的新结果
+        """
+        if not x and not y:
+            return self
+        return TextBoxes(self.listText, self.arrBox + np.array([x, y, x, y], dtype=np.int32))
+
+    def __len__(self):
+        return len(self.listText)
+
+    def __iter__(self):
+        for text, (x1, y1, x2, y2) in zip(self.listText, self.arrBox.tolist()):
+            yield TextBox(text, Rect(x1, y1, x2, y2))
+
+    def __getitem__(self, index: int) -> TextBox:
+        x1, y1, x2, y2 = self.arrBox[index].tolist()
+        return TextBox(self.listText[index], Rect(x1, y1, x2, y2))
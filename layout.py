@@ -0,0 +1,254 @@
+import json
+import os
+import sqlite3
+import threading
+
+from constants import Setting
+from persist import writeBehind
+from utils import PositionModel
+
+
+class LayoutStore:
+    """
+    坐标布局仓库，将页面、任务与模板图片的已知位置统一存入SQLite
+    以(分辨率, 缩放系数, 类别, 所属页面或任务, 文本)为主键，启动时一次读出全部记录，新位置先更新内存再由后台线程合并写入
+    当前分辨率缺少的记录由其他分辨率的记录按比例投影得到，投影位置未经验证，首次使用时需确认
+    """
+
+    def __init__(self, path: str = "json/layout.db"):
+        """
+        :param path: 数据库文件路径
+        """
+        self.path = path
+        self.connection = None  # 数据库连接，首次使用时建立
+        self.lock = threading.Lock()  # 保护内存中的记录
+        self.lockConnection = threading.Lock()  # 保护数据库连接，后台写入时不阻塞查询
+        self.key = None  # 已读取记录的(宽, 高, 缩放系数)
+        self.dictPos = {}  # 键为(类别, 所属名, 文本)，值为位置模型
+        self.setVerified = set()  # 当前分辨率下已验证的记录键，其余为投影位置
+        self.dictDirty = {}  # 待写入的记录，键为(宽, 高, 缩放系数, 类别, 所属名, 文本)，值为位置模型
+        self.dictFlushing = {}  # 正在写入的记录，写入完成前读取时仍需包含
+
+    @staticmethod
+    def get_key() -> tuple:
+        """
+        当前分辨率与缩放系数
+        """
+        return Setting.screenWidth, Setting.screenHeight, Setting.scaleFactor or 1.0
+
+    def __connect(self):
+        """
+        建立数据库连接，新建数据库时导入原有json文件
+        """
+        dirpath = os.path.dirname(self.path)
+        if dirpath and not os.path.exists(dirpath):
+            os.makedirs(dirpath)
+
+        # WAL模式下读写互不阻塞，多个进程可同时使用
+        self.connection = sqlite3.connect(self.path, timeout=10, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        with self.connection:
+            self.connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS layout (
+                    width INTEGER NOT NULL,
+                    height INTEGER NOT NULL,
+                    scale REAL NOT NULL,
+                    kind TEXT NOT NULL,
+                    owner TEXT NOT NULL,
+                    text TEXT NOT NULL,
+                    x1 INTEGER NOT NULL,
+                    y1 INTEGER NOT NULL,
+                    x2 INTEGER NOT NULL,
+                    y2 INTEGER NOT NULL,
+                    PRIMARY KEY (width, height, scale, kind, owner, text)
+                )
+                """
+            )
+            if self.connection.execute("PRAGMA user_version").fetchone()[0] == 0:
+                self.__migrate()
+                self.connection.execute("PRAGMA user_version = 1")
+
+    def __migrate(self, dirpath: str = "json"):
+        """
+        导入原有的页面、任务与模板图片json文件，记录视为当前分辨率下的位置
+        """
+        listRecord = []  # (类别, 所属名, 文本, 位置字典)列表
+
+        dirPage = os.path.join(dirpath, "page")
+        for fileName in os.listdir(dirPage) if os.path.isdir(dirPage) else []:
+            if not fileName.endswith(".json"):
+                continue
+            with open(os.path.join(dirPage, fileName), 'r', encoding='utf-8') as file:
+                data = json.load(file)
+            listRecord.append(("page", data['pageName'], data['modelSpecialText']['text'], data['modelSpecialText']['pos']))
+            for pageRoute in data['route']:
+                modelText = pageRoute['modelDirectText']
+                listRecord.append(("route", data['pageName'], modelText['text'], modelText['pos']))
+
+        dirTask = os.path.join(dirpath, "task")
+        for fileName in os.listdir(dirTask) if os.path.isdir(dirTask) else []:
+            if not fileName.endswith(".json"):
+                continue
+            with open(os.path.join(dirTask, fileName), 'r', encoding='utf-8') as file:
+                data = json.load(file)
+            for modelText in data if isinstance(data, list) else [data]:
+                listRecord.append(("task", fileName[:-5], modelText['text'], modelText['pos']))
+
+        dirImage = os.path.join(dirpath, "image")
+        for fileName in os.listdir(dirImage) if os.path.isdir(dirImage) else []:
+            if not fileName.endswith(".json"):
+                continue
+            with open(os.path.join(dirImage, fileName), 'r', encoding='utf-8') as file:
+                data = json.load(file)
+            listRecord.append(("image", "", data['text'], data['pos']))
+
+        self.connection.executemany(
+            "INSERT OR REPLACE INTO layout VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            [
+                (*self.get_key(), kind, owner, text, pos['x1'], pos['y1'], pos['x2'], pos['y2'])
+                for kind, owner, text, pos in listRecord if pos
+            ]
+        )
+
+    def __load(self):
+        """
+        一次读出全部记录，当前分辨率缺少的记录由其他分辨率投影，分辨率变化时重新读取
+        """
+        key = self.get_key()
+        if key == self.key:
+            return
+
+        with self.lockConnection:
+            if self.connection is None:
+                self.__connect()
+
+            width, height, _ = key
+            rows = self.connection.execute(
+                "SELECT width, height, scale, kind, owner, text, x1, y1, x2, y2 FROM layout"
+            ).fetchall()
+        rows = [
+            (*keyDirty, pos.x1, pos.y1, pos.x2, pos.y2)
+            for keyDirty, pos in {**self.dictFlushing, **self.dictDirty}.items()
+        ] + rows  # 尚未写入的记录优先
+
+        # 按分辨率分组，当前分辨率排在最前，其余按记录数降序，同一记录取最先出现的
+        dictGroup = {}
+        for row in rows:
+            dictGroup.setdefault(row[:3], []).append(row[3:])
+        listKey = sorted(dictGroup, key=lambda keyGroup: (keyGroup != key, -len(dictGroup[keyGroup])))
+
+        self.dictPos = {}
+        self.setVerified = set()
+        for keyGroup in listKey:
+            ratioX = width / keyGroup[0]
+            ratioY = height / keyGroup[1]
+            for kind, owner, text, x1, y1, x2, y2 in dictGroup[keyGroup]:
+                keyPos = (kind, owner, text)
+                if keyPos in self.dictPos:
+                    continue
+
+                if keyGroup == key:
+                    self.setVerified.add(keyPos)
+                self.dictPos[keyPos] = PositionModel(
+                    x1=round(x1 * ratioX),
+                    y1=round(y1 * ratioY),
+                    x2=round(x2 * ratioX),
+                    y2=round(y2 * ratioY)
+                )
+        self.key = key
+
+    def get(self, kind: str, owner: str, text: str):
+        """
+        查询位置
+        :param kind: 类别，page为页面特征文本，route为次级界面指向文本，task为任务文本，image为模板图片
+        :param owner: 所属页面或任务名，模板图片为空字符串
+        :param text: 文本或模板图片名
+        :return: 位置模型，未记录时返回None
+        """
+        with self.lock:
+            self.__load()
+            return self.dictPos.get((kind, owner, text))
+
+    def get_owner(self, kind: str, owner: str) -> dict:
+        """
+        查询某一页面或任务下的全部位置
+        :return: 键为文本，值为位置模型
+        """
+        with self.lock:
+            self.__load()
+            return {
+                text: pos for (kindPos, ownerPos, text), pos in self.dictPos.items()
+                if kindPos == kind and ownerPos == owner
+            }
+
+    def is_verified(self, kind: str, owner: str, text: str) -> bool:
+        """
+        位置是否为当前分辨率下记录或验证过的位置
+        """
+        with self.lock:
+            self.__load()
+            return (kind, owner, text) in self.setVerified
+
+    def discard(self, kind: str, owner: str, text: str):
+        """
+        丢弃验证失败的投影位置，已验证的位置不受影响
+        """
+        with self.lock:
+            self.__load()
+            keyPos = (kind, owner, text)
+            if keyPos not in self.setVerified:
+                self.dictPos.pop(keyPos, None)
+
+    def put(self, kind: str, owner: str, text: str, pos: PositionModel):
+        """
+        写入单条位置记录，记录视为已验证，数据库由后台线程写入
+        :param kind: 类别
+        :param owner: 所属页面或任务名
+        :param text: 文本或模板图片名
+        :param pos: 位置模型
+        """
+        pos = PositionModel(x1=int(pos.x1), y1=int(pos.y1), x2=int(pos.x2), y2=int(pos.y2))  # 识别结果在存储时转换为位置模型
+        with self.lock:
+            self.__load()
+            self.dictPos[(kind, owner, text)] = pos
+            self.setVerified.add((kind, owner, text))
+            self.dictDirty[(*self.key, kind, owner, text)] = pos
+        writeBehind.mark(self.path, self.flush)
+
+    def flush(self):
+        """
+        在一个事务中写入所有待写入的记录
+        """
+        with self.lock:
+            self.dictFlushing, self.dictDirty = self.dictDirty, {}
+        if not self.dictFlushing:
+            return
+
+        try:
+            with self.lockConnection:
+                if self.connection is None:
+                    self.__connect()
+
+                with self.connection:
+                    self.connection.executemany(
+                        "INSERT OR REPLACE INTO layout VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        [
+                            (*keyDirty, int(pos.x1), int(pos.y1), int(pos.x2), int(pos.y2))
+                            for keyDirty, pos in self.dictFlushing.items()
+                        ]
+                    )
+
+        except sqlite3.Error:  # 写入失败时放回待写入记录，并重新标记以便下次重试
+            with self.lock:
+                self.dictDirty = {**self.dictFlushing, **self.dictDirty}
+            writeBehind.mark(self.path, self.flush)
+            raise
+
+        finally:
+            with self.lock:
+                self.dictFlushing = {}
+
+
+layoutStore = LayoutStore()
@@ -1,21 +1,9 @@
-import json
-import subprocess
-import time
-
-from task import task
-from utils import refresh_setting, login
+from task import Scheduler
 
 
 def main():
-    refresh_setting()
-
-    # login()
-    # task.paiqian()
-    # task.ziyuanshengchan()
-    # task.qingbaochubei()
-    # task.banzu_yaowu()
-    # task.banzu_buji()
-    task.shibingyanxi()
+    scheduler = Scheduler()
+    scheduler.run_forever()
 
 
 if __name__ == '__main__':
@@ -0,0 +1,213 @@
+import io
+import os
+from collections import deque
+
+import cv2
+import numpy as np
+
+from capture import Frame
+from constants import Setting
+from persist import write_atomic, writeBehind
+
+
+class AhoCorasick:
+    """
+    AC自动机，一次扫描文本找出所有出现的模式串
+    """
+
+    def __init__(self, listPattern: list):
+        """
+        :param listPattern: 模式串列表
+        """
+        self.listGoto = [{}]  # 各状态的转移表
+        self.listFail = [0]  # 各状态的失配指针
+        self.listOutput = [set()]  # 各状态匹配到的模式串序号
+
+        for index, pattern in enumerate(listPattern):
+            state = 0
+            for char in pattern:
+                if char not in self.listGoto[state]:
+                    self.listGoto.append({})
+                    self.listFail.append(0)
+                    self.listOutput.append(set())
+                    self.listGoto[state][char] = len(self.listGoto) - 1
+                state = self.listGoto[state][char]
+            self.listOutput[state].add(index)
+
+        # 广度优先构建失配指针
+        queue = deque(self.listGoto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, stateNext in self.listGoto[state].items():
+                queue.append(stateNext)
+                fail = self.listFail[state]
+                while fail and char not in self.listGoto[fail]:
+                    fail = self.listFail[fail]
+                self.listFail[stateNext] = self.listGoto[fail].get(char, 0)
+                if self.listFail[stateNext] == stateNext:
+                    self.listFail[stateNext] = 0
+                self.listOutput[stateNext] |= self.listOutput[self.listFail[stateNext]]
+
+    def search(self, text: str) -> set:
+        """
+        查找文本中出现的模式串
+        :param text: 文本
+        :return: 出现的模式串序号集合
+        """
+        setFound = set()
+        state = 0
+        for char in text:
+            while state and char not in self.listGoto[state]:
+                state = self.listFail[state]
+            state = self.listGoto[state].get(char, 0)
+            setFound |= self.listOutput[state]
+        return setFound
+
+
+class PageIndex:
+    """
+    页面特征文本索引，完全匹配的特征文本用哈希表查找，部分匹配的用AC自动机查找
+    """
+
+    def __init__(self, dictPages: dict):
+        """
+        :param dictPages: 页面模型字典
+        """
+        self.dictOrder = {pageName: index for index, pageName in enumerate(dictPages)}  # 页面预设顺序
+        self.dictExact = {}  # 键为特征文本，值为页面名列表
+        self.listPatternPage = []  # 各模式串对应的(页面名, 是否为部分匹配页面)
+        for modelPage in dictPages.values():
+            text = modelPage.modelSpecialText.text
+            self.dictExact.setdefault(text, []).append(modelPage.pageName)
+            self.listPatternPage.append((modelPage.pageName, modelPage.typeMatch == "part"))
+
+        self.automaton = AhoCorasick([modelPage.modelSpecialText.text for modelPage in dictPages.values()])
+        self.dictLength = {
+            modelPage.pageName: len(modelPage.modelSpecialText.text) for modelPage in dictPages.values()
+        }
+
+    def resolve(self, listTextModel: list, typeMatch: str = "whole") -> list:
+        """
+        一次扫描识别结果，找出所有匹配的页面
+        typeMatch为whole时，完全匹配页面要求文本一致，部分匹配页面（typeMatch为part）要求包含特征文本；
+        typeMatch为part时所有页面均按包含特征文本匹配
+        :param listTextModel: 文本模型列表
+        :param typeMatch: 识别类型（完全匹配whole或部分匹配part）
+        :return: (页面名, 文本模型)列表，按完全匹配优先、特征文本长度降序、页面预设顺序排列
+        """
+        dictMatch = {}  # 键为页面名，值为(是否完全匹配, 文本模型)
+        for modelText in listTextModel:
+            for pageName in self.dictExact.get(modelText.text, []):
+                if pageName not in dictMatch or not dictMatch[pageName][0]:
+                    dictMatch[pageName] = (True, modelText)
+
+            for index in self.automaton.search(modelText.text):
+                pageName, boolPart = self.listPatternPage[index]
+                if (boolPart or typeMatch == "part") and pageName not in dictMatch:
+                    dictMatch[pageName] = (False, modelText)
+
+        listMatch = sorted(
+            dictMatch.items(),
+            key=lambda item: (not item[1][0], -self.dictLength[item[0]], self.dictOrder[item[0]])
+        )
+        return [(pageName, modelText) for pageName, (_, modelText) in listMatch]
+
+
+class PageFingerprint:
+    """
+    页面视觉指纹，页面首次被OCR识别时记录缩略灰度图，之后直接比对缩略图识别页面
+    """
+
+    def __init__(self, dirpath: str = "json/page", size: tuple = (64, 36)):
+        """
+        :param dirpath: 指纹文件夹，与页面json文件存放在一起
+        :param size: 缩略图尺寸(宽, 高)
+        """
+        self.dirpath = dirpath
+        self.size = size
+        self.dictThumb = {}  # 键为页面名，值为缩略灰度图
+        self.listPageName = []  # 指纹矩阵各行对应的页面名
+        self.arrFingerprint = np.zeros((0, size[0] * size[1]), dtype=np.float32)  # 归一化后的指纹矩阵
+        self.load()
+
+    def load(self):
+        """
+        读取所有页面指纹
+        """
+        if not os.path.exists(self.dirpath):
+            return
+
+        for fileName in os.listdir(self.dirpath):
+            if fileName.endswith(".npy"):
+                thumb = np.load(os.path.join(self.dirpath, fileName))
+                if thumb.shape == (self.size[1], self.size[0]):
+                    self.dictThumb[fileName[:-4]] = thumb.astype(np.float32)
+        self.__build()
+
+    def __build(self):
+        """
+        重建归一化指纹矩阵
+        """
+        self.listPageName = list(self.dictThumb)
+        if not self.listPageName:
+            self.arrFingerprint = np.zeros((0, self.size[0] * self.size[1]), dtype=np.float32)
+            return
+        self.arrFingerprint = np.stack([self.normalize(self.dictThumb[name]) for name in self.listPageName])
+
+    @staticmethod
+    def normalize(thumb: np.ndarray) -> np.ndarray:
+        """
+        去均值并归一化，使点积即为相关系数
+        """
+        vector = thumb.astype(np.float32).ravel()
+        vector = vector - vector.mean()
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def get_thumb(self, image: Frame) -> np.ndarray:
+        """
+        计算画面的缩略灰度图
+        """
+        small = cv2.resize(image.bgra, self.size, interpolation=cv2.INTER_AREA)
+        return cv2.cvtColor(small, cv2.COLOR_BGRA2GRAY).astype(np.float32)
+
+    def classify(self, image: Frame) -> tuple:
+        """
+        比对画面与所有页面指纹
+        :param image: 整个画面的截图帧
+        :return: (最相似页面名, 是否可信)，无指纹时返回(None, False)
+        """
+        if not self.listPageName:
+            return None, False
+
+        arrScore = self.arrFingerprint @ self.normalize(self.get_thumb(image))
+        order = np.argsort(arrScore)[::-1]
+        best = arrScore[order[0]]
+        second = arrScore[order[1]] if len(order) > 1 else -1.0
+        boolConfident = best >= Setting.fingerprintThreshold and best - second >= Setting.fingerprintMargin
+        return self.listPageName[order[0]], bool(boolConfident)
+
+    def learn(self, pageName: str, image: Frame):
+        """
+        记录或更新页面指纹
+        :param pageName: OCR识别出的页面名
+        :param image: 整个画面的截图帧
+        """
+        thumb = self.get_thumb(image)
+        if pageName in self.dictThumb:  # 与已有指纹平滑融合
+            thumb = self.dictThumb[pageName] * 0.8 + thumb * 0.2
+        self.dictThumb[pageName] = thumb
+        self.__build()
+
+        path = os.path.join(self.dirpath, pageName + ".npy")
+        writeBehind.mark(path, lambda: self.save(pageName, path))
+
+    def save(self, pageName: str, path: str):
+        """
+        写入页面指纹文件
+        :param pageName: 页面名
+        :param path: 指纹文件路径
+        """
+        buffer = io.BytesIO()
+        np.save(buffer, self.dictThumb[pageName].astype(np.uint8))
+        write_atomic(path, buffer.getvalue())
@@ -1,23 +1,24 @@
-import shutil
-
-from PIL import Image
+import copy
 
 import json
-import os
 import subprocess
 import time
-from ctypes import windll
 
-import cv2
 import numpy as np
-import win32con
-import win32gui
-import win32ui
 from pydantic import BaseModel, Field
 
+from cache import ChangeDetector, ocrCache
+from capture import CaptureBackend, Frame, WindowCapture, clip_region
 from constants import Setting
-from control import Control
-from utils import timer, ocr, logger, PositionModel
+from digit import digitRecognizer
+from geometry import Rect, TextBox, TextBoxes
+from layout import layoutStore
+from matcher import PageFingerprint, PageIndex
+from pipeline import get_pipeline
+from route import EdgeStats, RouteTable
+from template import PositionCache, Template, match_many, match_pyramid, templateStore
+from waiter import Waiter, WaitTimeout
+from utils import timer, get_ocr, warmup_ocr, logger, PositionModel
 
 # 预设页面列表
 listDictPages = [
@@ -342,32 +343,19 @@ class PageModel(BaseModel):
 
 def read_pageJson(dictPage):
     """
-    读取页面json文件
-    :return: 页面模型列表
+    读取页面已记录的特征位置
+    :return: 填入已记录位置的页面字典，特征文本或路径文本与预设不同时对应位置为空
     """
-    try:  # 存在该页面json文件
-        with open("json/page/" + dictPage['pageName'] + ".json", 'r', encoding='utf-8') as file:
-            data = json.load(file)
-
-        listDataRoute = []  # 预设路径文本列表
-        for pageRoute in data['route']:
-            listDataRoute.append(pageRoute['modelDirectText']['text'])
-
-        listDictPagesRoute = []  # 默认路径文本列表
-        for pageRoute in dictPage['route']:
-            listDictPagesRoute.append(pageRoute['modelDirectText']['text'])
-
-        if (
-                data['modelSpecialText']['text'] == dictPage['modelSpecialText']['text'] and  # 特征文本与预设一致
-                listDictPagesRoute == listDataRoute  # 下一界面路径与预设一致
-        ):
-            return data
-
-        else:
-            return dictPage
+    dictPage = copy.deepcopy(dictPage)  # 不修改预设
+    pageName = dictPage['pageName']
+    listText = [("page", dictPage['modelSpecialText'])]
+    listText += [("route", pageRoute['modelDirectText']) for pageRoute in dictPage['route']]
+    for kind, modelText in listText:
+        pos = layoutStore.get(kind, pageName, modelText['text'])
+        if pos:
+            modelText['pos'] = pos
 
-    except FileNotFoundError:  # 不存在该页面json文件
-        return dictPage
+    return dictPage
 
 
 def get_dictPages():
@@ -377,7 +365,7 @@ def get_dictPages():
     """
     _dictPages = {}  # 初始化全页面
     for dictPage in listDictPages:
-        dictPage = read_pageJson(dictPage)  # 检索是否存在该页面json文件
+        dictPage = read_pageJson(dictPage)  # 检索该页面已记录的位置
         _dictPages[dictPage['pageName']] = PageModel(**dictPage)
 
     return _dictPages
@@ -392,28 +380,24 @@ class OCRResultError(Exception):
 
 def ocr_textAll(image):
     """
-    识别图像中的所有文字
+    识别图像中的所有文字，相同画面直接返回缓存结果
+    :param image: 截图帧或RGB图像np数组
     """
-    listResults = ocr(image)[0]
+    return ocrCache.recognize(image, ocr_image)
+
+
+def ocr_image(image):
+    """
+    调用OCR引擎识别图像中的所有文字
+    :param image: 截图帧或RGB图像np数组
+    """
+    if isinstance(image, Frame):
+        image = image.rgb
+    listResults = get_ocr()(image)[0]
     if not listResults:  # 检测不到文字报错
         return None
 
-    listTextModel = []
-    for result in listResults:
-        confidence = result[2]
-        if confidence > Setting.threshold:
-            text = result[1]
-            box = result[0]
-            modelPos = PositionModel(
-                x1=box[0][0],
-                y1=box[0][1],
-                x2=box[2][0],
-                y2=box[2][1]
-            )
-            modelText = TextModel(text=text, pos=modelPos)
-            listTextModel.append(modelText)
-
-    return listTextModel
+    return TextBoxes.from_ocr(listResults, Setting.threshold)
 
 
 def textmatch_whole(text: str, modelText: TextModel) -> bool:
@@ -444,50 +428,160 @@ def textmatch_part(text: str, modelText: TextModel) -> bool:
         return False
 
 
-def ocr_crop(image, pos: PositionModel):
+def ocr_crop(image: Frame, pos: PositionModel):
     """
     裁剪图像识别文字
-    :param image: 原图像，用以裁剪
+    :param image: 原图像帧，用以裁剪
     :param pos: 位置模型
     :return: 识别结果
     """
-    imageCrop = image[pos.y1:pos.y2, pos.x1:pos.x2]
+    imageCrop = image.crop(pos)
     listTextModel = ocr_textAll(imageCrop)
     if not listTextModel:  # 检测不到文字
         return None
 
-    # 对识别结果的位置进行修正
-    listReturnTextModel = []
-    for modelText in listTextModel:
-        text = modelText.text
-        position = PositionModel(
-            x1=modelText.pos.x1 + pos.x1,
-            y1=modelText.pos.y1 + pos.y1,
-            x2=modelText.pos.x2 + pos.x1,
-            y2=modelText.pos.y2 + pos.y1
-        )
-        model = TextModel(
-            text=text,
-            pos=position
-        )
-        listReturnTextModel.append(model)
+    return listTextModel.offset(imageCrop.x, imageCrop.y)  # 对识别结果的位置进行修正
+
+
+def ocr_rec_batch(listImage: list) -> list:
+    """
+    跳过文本检测，将每幅图像作为一个文本行批量识别，用于文本框已知的区域
+    :param listImage: 文本框区域图像帧列表
+    :return: 与listImage对应的文本模型列表，识别置信度不足时为None
+    """
+    listReturn = [None] * len(listImage)
+    listIndex = [index for index, image in enumerate(listImage) if image.bgra.size]
+    if not listIndex:
+        return listReturn
+
+    ocr = get_ocr()
+    listLine = [listImage[index].rgb for index in listIndex]
+    if Setting.boolRecCls:  # 方向分类
+        listLine = ocr.text_cls(listLine)[0]
+
+    listRec = ocr.text_rec(listLine)[0]
+    for index, result in zip(listIndex, listRec):
+        text, confidence = result[0], result[1]
+        if not text or confidence <= Setting.threshold:
+            continue
 
-    return listReturnTextModel
+        image = listImage[index]
+        height, width = image.shape
+        listReturn[index] = TextBox(text, Rect(image.x, image.y, image.x + width, image.y + height))
+
+    return listReturn
+
+
+def ocr_rec(image: Frame):
+    """
+    跳过文本检测，将整幅图像作为一个文本行识别
+    :param image: 文本框区域图像帧
+    :return: 文本模型，识别置信度不足时返回None
+    """
+    return ocr_rec_batch([image])[0]
+
+
+def merge_pos(listPos: list) -> tuple:
+    """
+    合并相互重叠的区域
+    :param listPos: 位置模型列表
+    :return: (合并后的位置模型列表, 各输入区域所属的合并区域序号列表)
+    """
+    listMerged = []  # 合并后的区域
+    listGroup = []  # 各输入区域所属的合并区域序号
+    for pos in listPos:
+        for index, merged in enumerate(listMerged):
+            if pos.x1 < merged.x2 and merged.x1 < pos.x2 and pos.y1 < merged.y2 and merged.y1 < pos.y2:
+                listMerged[index] = Rect(
+                    min(pos.x1, merged.x1),
+                    min(pos.y1, merged.y1),
+                    max(pos.x2, merged.x2),
+                    max(pos.y2, merged.y2)
+                )
+                listGroup.append(index)
+                break
+        else:
+            listMerged.append(pos)
+            listGroup.append(len(listMerged) - 1)
+
+    return listMerged, listGroup
+
+
+def get_bounding_pos(listPos: list) -> Rect:
+    """
+    获取包含所有区域的最小矩形
+    :param listPos: 位置模型列表
+    :return: 位置
+    """
+    return Rect(
+        min(pos.x1 for pos in listPos),
+        min(pos.y1 for pos in listPos),
+        max(pos.x2 for pos in listPos),
+        max(pos.y2 for pos in listPos)
+    )
+
+
+def expand_pos(pos: PositionModel) -> Rect:
+    """
+    扩展位置模型，用于在投影位置附近验证文本
+    :param pos: 位置模型
+    :return: 向四周各扩展验证边距与半个文本框高度的位置
+    """
+    margin = Setting.verifyMargin + (pos.y2 - pos.y1) // 2
+    return Rect(max(pos.x1 - margin, 0), max(pos.y1 - margin, 0), pos.x2 + margin, pos.y2 + margin)
+
+
+def ocr_batch(image: Frame, listPos: list):
+    """
+    同一帧内多个区域批量识别文字，各区域分别检测文本框，所有文本行合并为一批识别
+    :param image: 原图像帧
+    :param listPos: 位置模型列表
+    :return: 与listPos对应的识别结果列表，区域内检测不到文字时为None
+    """
+    ocr = get_ocr()
+    listLine = []  # 所有区域的文本行图像
+    listBox = []  # 文本行对应的(区域序号, 文本框)
+    listCrop = [image.crop(pos) for pos in listPos]
+    for index, imageCrop in enumerate(listCrop):
+        rgb = imageCrop.rgb
+        listDetBox = ocr(rgb, use_cls=False, use_rec=False)[0]  # 只检测文本框
+        if not listDetBox:
+            continue
+
+        listLine += ocr.get_crop_img_list(rgb, [np.array(box, dtype=np.float32) for box in listDetBox])
+        listBox += [(index, box) for box in listDetBox]
+
+    listReturn = [[] for _ in listPos]  # 各区域的(文本框, 文本, 置信度)列表
+    if listLine:
+        if ocr.use_cls:  # 与完整识别保持一致，先进行方向分类
+            listLine = ocr.text_cls(listLine)[0]
+        listRec = ocr.text_rec(listLine)[0]  # 批量识别
+
+        for (index, box), result in zip(listBox, listRec):
+            listReturn[index].append((box, result[0], result[1]))
+
+    return [
+        TextBoxes.from_ocr(listResults, Setting.threshold).offset(imageCrop.x, imageCrop.y) or None
+        for listResults, imageCrop in zip(listReturn, listCrop)
+    ]
 
 
 def write_pageJson(modelPage):
     """
-    将页面特征写入json文件
+    将页面特征位置写入布局仓库
     """
-    data = modelPage.dict()  # 获取页面特征json
-    data = json.dumps(data, indent=4, ensure_ascii=False)  # 确保中文不会转义
-    dirpath = 'json/page'
-    if not os.path.exists(dirpath):
-        os.makedirs(dirpath)
+    listText = [("page", modelPage.modelSpecialText)]
+    listText += [("route", modelPageRoute.modelDirectText) for modelPageRoute in modelPage.route]
+    for kind, modelText in listText:
+        if not modelText.pos:
+            continue
+        if (
+            not layoutStore.is_verified(kind, modelPage.pageName, modelText.text) and
+            modelText.pos == layoutStore.get(kind, modelPage.pageName, modelText.text)
+        ):  # 未经验证的投影位置不写入
+            continue
 
-    file = dirpath + '/' + modelPage.pageName + '.json'
-    with open(file, 'w', encoding='utf-8') as file:
-        file.write(data)   # 写入json文件
+        layoutStore.put(kind, modelPage.pageName, modelText.text, modelText.pos)
 
 
 def get_signRecordPos(modelPage) -> bool:
@@ -513,16 +607,6 @@ class UnknownPage(Exception):
     pass
 
 
-def delete_json():
-    """
-    启动时若检测到屏幕分辨率或缩放因子与预设不同，则删除page文件夹内的预设
-    """
-    path = 'json'
-    for filename in os.listdir(path):
-        file_path = os.path.join(path, filename)
-        shutil.rmtree(file_path)
-
-
 def start_game():
     """
     启动游戏
@@ -539,6 +623,8 @@ def get_scale_factor():
     :return: 缩放系数
     """
     try:
+        from ctypes import windll
+
         windll.shcore.SetProcessDpiAwareness(1)  # 设置进程的 DPI 感知
         scale_factor = windll.shcore.GetScaleFactorForDevice(
             0
@@ -551,23 +637,23 @@ def get_scale_factor():
 
 def write_imageJson(modelImage):
     """
-    将图片模型写入json文件
+    将图片模型写入布局仓库
     :param modelImage: 图片模型
     """
-    data = modelImage.dict()  # 获取页面特征json
-    data = json.dumps(data, indent=4, ensure_ascii=False)  # 确保中文不会转义
-    dirpath = 'json/image'
-    if not os.path.exists(dirpath):
-        os.makedirs(dirpath)
+    layoutStore.put("image", "", modelImage.text, modelImage.pos)
 
-    file = dirpath + '/' + modelImage.text + '.json'
-    with open(file, 'w', encoding='utf-8') as file:
-        file.write(data)  # 写入json文件
+
+def read_imageJson() -> dict:
+    """
+    读取所有模板图片的已记录位置
+    :return: 键为模板图片名，值为位置模型
+    """
+    return layoutStore.get_owner("image", "")
 
 
 def image_match(
-        img: np.ndarray,
-        imgTemplate: np.ndarray,
+        img: Frame,
+        template: Template,
         area: PositionModel = PositionModel(
             x1=0,
             y1=0,
@@ -576,62 +662,72 @@ def image_match(
         )
 ):
     """
-    使用 opencv matchTemplate 方法在指定区域内进行模板匹配并返回匹配结果
-    :param img:  大图片
-    :param imgTemplate: 小图片
+    在指定区域内进行金字塔模板匹配并返回匹配结果
+    :param img:  大图片帧
+    :param template: 已按屏幕分辨率缩放的模板，由templateStore提供
     :param area: 区域模型
     :return: ImgPosition 或 None
     """
-    # 判断是否为灰度图，如果不是转换为灰度图
-    if len(img.shape) == 3:
-        img = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-    if len(imgTemplate.shape) == 3:
-        imgTemplate = cv2.cvtColor(imgTemplate, cv2.COLOR_BGR2GRAY)
-
-    img = img[area.y1:area.y2, area.x1:area.x2]
-    # 模板图片根据屏幕分辨率宽度进行缩放
-    ratio = Setting.screenWidth / 3840
-    imgTemplate = cv2.resize(imgTemplate, None, fx=ratio, fy=ratio, interpolation=cv2.INTER_AREA)
-
-    # 模板匹配
-    res = cv2.matchTemplate(img, imgTemplate, cv2.TM_CCOEFF_NORMED)
-    confidence = np.max(res)
+    confidence, x, y = match_pyramid(img.crop(area), template)
     if confidence < Setting.threshold:
         return None
-    max_loc = np.where(res == confidence)
 
-    return PositionModel(
-        x1=area.x1 + max_loc[1][0],
-        y1=area.y1 + max_loc[0][0],
-        x2=area.x1 + max_loc[1][0] + imgTemplate.shape[1],
-        y2=area.y1 + max_loc[0][0] + imgTemplate.shape[0],
-    )
+    return Rect(x, y, x + template.width, y + template.height)
 
 
 class Page:
     """
     页面类，包含一些基本页面识别方法
     """
+    # 可由已初始化页面复用的窗口与识别状态
+    tupleShared = (
+        "pageFingerprint", "edgeStats", "hwnd", "boolWindowBar", "windowPosition", "scaleFactor",
+        "capture", "changeDetector", "pipeline", "dictPages", "pageIndex", "routeTable", "positionCache",
+        "control", "waiter"
+    )
 
-    def __init__(self):
+    def __init__(self, capture: CaptureBackend = None, base: "Page" = None):
+        """
+        :param capture: 截图后端，默认使用游戏窗口截图
+        :param base: 已初始化的页面，传入时复用其窗口与识别状态，不再重新查找窗口与检测分辨率
+        """
         # 声明
         self.limitRecoTimes = 5  # 识别次数限制
         self.limitRecoCD = 0.3  # 识别CD限制
         self.limitClickCD = 0.3  # 点击CD限制
-
         self.pageName = None  # 页面名称
-        self.dictPages = get_dictPages()  # 获取页面字典
-        self.route = []  # 路径界面名列表
+
+        if base is not None:
+            for name in self.tupleShared:
+                setattr(self, name, getattr(base, name))
+            return
+
+        self.pageFingerprint = PageFingerprint()  # 页面视觉指纹
+        self.edgeStats = EdgeStats()  # 页面切换耗时统计
         self.hwnd = None  # 窗口句柄
         self.boolWindowBar = None  # 窗口栏是否显示
         self.windowPosition = None  # 窗口位置
         self.scaleFactor = None  # 缩放系数
+        self.capture = capture  # 截图后端
+        self.changeDetector = ChangeDetector()  # 画面变化检测
+        self.pipeline = get_pipeline(self.screenshot) if Setting.ocrWorkers else None  # 识别流水线，进程内共用
 
+        warmup_ocr()  # 后台加载OCR模型，与窗口初始化并行
         self.__refresh_setting()  # 初始化设置
 
+        # 已记录的位置按实际分辨率读取
+        self.dictPages = get_dictPages()  # 获取页面字典
+        self.pageIndex = PageIndex(self.dictPages)  # 页面特征文本索引
+        self.routeTable = RouteTable(self.dictPages, self.edgeStats)  # 页面路径表，按实测耗时加权
+        self.positionCache = PositionCache(read_imageJson())  # 模板位置缓存
+        templateStore.load()  # 按当前分辨率预先缩放所有模板图片
+
+        from control import Control  # 仅Windows可用，推迟导入使页面数据与识别函数可在其他平台导入
+
         self.control = Control(
             windowPosition=self.windowPosition
         )
+        self.waiter = Waiter(lambda: self.control.timeAction)  # 自适应轮询等待
 
     def get_resolution(self):
         """
@@ -639,14 +735,14 @@ class Page:
         :param image: np图像
         :return:分辨率元组
         """
-        img = self.screenshot()
-        black_pixels_y = np.where(np.all(img[0] == 0, axis=1))[0]
+        img = self.screenshot().bgra  # 只检查首行首列，无需转换通道
+        black_pixels_y = np.where(np.all(img[0, :, :3] == 0, axis=1))[0]
         if black_pixels_y.size > 0:
             width = int(black_pixels_y[0])
         else:
             width = 3840
 
-        black_pixels_x = np.where(np.all(img[:, 0] == 0, axis=1))[0]
+        black_pixels_x = np.where(np.all(img[:, 0, :3] == 0, axis=1))[0]
         if black_pixels_x.size > 0:
             height = int(black_pixels_x[0])
         else:
@@ -654,41 +750,60 @@ class Page:
 
         return width, height
 
-    def screenshot(self):
+    def screenshot(self, pos: PositionModel = None) -> Frame:
         """
         截图
-        ：return: 截取到的图像np数组
-        """
-        hwndDC = win32gui.GetWindowDC(self.hwnd)  # 获取窗口设备上下文（DC）
-        mfcDC = win32ui.CreateDCFromHandle(hwndDC)  # 创建mfcDC
-        saveDC = mfcDC.CreateCompatibleDC()  # 创建与mfcDC兼容的DC
-        saveBitMap = win32ui.CreateBitmap()  # 创建一个位图对象
-        saveBitMap.CreateCompatibleBitmap(mfcDC, Setting.screenWidth, Setting.screenHeight)  # 创建与mfcDC兼容的位图
-        saveDC.SelectObject(saveBitMap)  # 选择saveDC的位图对象，准备绘图
-        # 尝试使用PrintWindow函数截取窗口图像
-        windll.user32.PrintWindow(self.hwnd, saveDC.GetSafeHdc(), 3)
-
-        # 从位图中获取图像数据
-        bmp_info = saveBitMap.GetInfo()  # 获取位图信息
-        bmp_str = saveBitMap.GetBitmapBits(True)  # 获取位图数据
-        im = np.frombuffer(bmp_str, dtype="uint8")  # 将位图数据转换为numpy数组
-        im.shape = (bmp_info["bmHeight"], bmp_info["bmWidth"], 4)  # 设置数组形状
-        # 调整通道顺序并去除alpha通道
-        im = im[:, :, :3]
-        im = im[:, :, [2, 1, 0]]
-
-        # 清理资源
-        win32gui.DeleteObject(saveBitMap.GetHandle())
-        saveDC.DeleteDC()
-        mfcDC.DeleteDC()
-        win32gui.ReleaseDC(self.hwnd, hwndDC)
-
-        return im  # 返回截取到的图像
+        :param pos: 位置模型，传入时只截取该区域
+        ：return: 截取到的图像帧
+        """
+        im = self.capture.grab(Setting.screenWidth, Setting.screenHeight, pos)
+        if pos is None:
+            return Frame(im)
+
+        x1, y1, _, _ = clip_region(pos, Setting.screenWidth, Setting.screenHeight)
+        return Frame(im, x1, y1)  # 记录区域原点，后续识别结果据此修正坐标
+
+    def ocr_region(self, pos: PositionModel, img: Frame = None):
+        """
+        只截取目标区域并识别文字
+        :param pos: 位置模型
+        :param img: 已截取的包含该区域的图像帧，为空时重新截图
+        :return: 识别结果，位置为整个画面中的坐标
+        """
+        img = self.screenshot(pos) if img is None else img.crop(pos)
+        return self.changeDetector.recognize(
+            key=str(pos),
+            image=img,
+            func=lambda image: ocr_crop(image, pos)
+        )  # 区域画面未变化时复用上次识别结果
+
+    def read_digits(self, pos: PositionModel):
+        """
+        识别区域内的计数等短文本，优先使用数字模板，无法识别时使用OCR并学习模板
+        :param pos: 位置模型
+        :return: 识别出的文本，区域内检测不到文字时返回None
+        """
+        img = self.screenshot(pos)
+        text = digitRecognizer.read(img)
+        if text is not None:
+            return text
+
+        listTextModel = self.ocr_region(pos, img)
+        if not listTextModel:
+            return None
+
+        text = listTextModel[0].text
+        if len(listTextModel) == 1:  # 区域内只有一行文本时才能与切分出的字符对应
+            digitRecognizer.learn(img, text)
+        return text
 
     def __has_title_bar(self) -> bool:
         """
         判断窗口是否带有标题栏
         """
+        import win32con
+        import win32gui
+
         style = win32gui.GetWindowLong(self.hwnd, win32con.GWL_STYLE)
         return bool(style & win32con.WS_CAPTION)
 
@@ -697,6 +812,8 @@ class Page:
         获取窗口位置
         :return: 窗口位置元组
         """
+        import win32gui
+
         rect = win32gui.GetWindowRect(self.hwnd)
         if self.boolWindowBar:  # 如果有标题栏
             pos = (rect[0], rect[1] + Setting.titleBarHeight)
@@ -709,6 +826,8 @@ class Page:
         刷新设置
         :return: 检测窗口是否存在的布尔值
         """
+        import win32gui
+
         self.hwnd = win32gui.FindWindow("UnityWndClass", "少女前线2：追放")
         if not self.hwnd:
             logger("未找到游戏窗口，启动游戏")
@@ -716,19 +835,19 @@ class Page:
 
         # 切换窗口至前台
         win32gui.SetForegroundWindow(self.hwnd)
+        if not self.capture:
+            self.capture = WindowCapture(self.hwnd)  # 截图资源随窗口创建并复用
         screenWidth, screenHeight = self.get_resolution()
         self.scaleFactor = get_scale_factor()
         if (
             Setting.screenWidth != screenWidth or
             Setting.screenHeight != screenHeight or
             Setting.scaleFactor != self.scaleFactor
-        ):  # 如果界面分辨率和屏幕缩放因子与预设不同，则删除page文件夹内的预设重新获取
+        ):  # 界面分辨率或屏幕缩放因子与预设不同时，布局仓库将已记录的位置投影到当前分辨率，首次使用时验证
             Setting.screenWidth = screenWidth
             Setting.screenHeight = screenHeight
             Setting.scaleFactor = self.scaleFactor
 
-            delete_json()  # 删除page文件夹内的预设
-
         self.boolWindowBar = self.__has_title_bar()  # 窗口是否有标题栏
         self.windowPosition = self.get_window_position()  # 获取窗口位置
 
@@ -738,54 +857,58 @@ class Page:
         :param typeMatch: 识别类型（完全匹配whole或部分匹配part）
         :return: 页面名
         """
-        textmatch = None
-        if typeMatch == "whole":  # 完全匹配
-            textmatch = textmatch_whole
-
-        if typeMatch == "part":  # 部分匹配
-            textmatch = textmatch_part
-
         img = self.screenshot()
+        pageName, boolConfident = self.pageFingerprint.classify(img)  # 先比对页面视觉指纹
+        if boolConfident and pageName in self.dictPages and not get_signRecordPos(self.dictPages[pageName]):
+            # 指纹相近的弹窗可能覆盖在该页面之上，只识别特征文本框确认
+            modelSpecialText = self.dictPages[pageName].modelSpecialText
+            textMatch = textmatch_whole if self.dictPages[pageName].typeMatch == "whole" else textmatch_part
+            if layoutStore.is_verified("page", pageName, modelSpecialText.text):
+                pos = modelSpecialText.pos
+                modelText = self.changeDetector.recognize("rec" + str(pos), img.crop(pos), ocr_rec)
+                if modelText and textMatch(text=modelSpecialText.text, modelText=modelText):
+                    self.pageName = pageName
+                    return self.pageName
+
+        # 整帧的缩略签名分辨不出标题等局部变化，不经画面变化检测，只由像素哈希缓存复用完全相同画面的结果
         listTextModel = ocr_textAll(img)
+        while not listTextModel:  # 未识别到文本则重新截图识别
+            img = self.screenshot()
+            listTextModel = ocr_textAll(img)
 
-        if not listTextModel:  # 未识别到文本
-            return self.reco_page(typeMatch=typeMatch)
-
-        signLoop0 = True  # 外循环信号
         pageName = None
         pos = None
-        for modelPage in self.dictPages.values():
-            if not signLoop0:  # 跳出外循环
-                break
-
-            signLoop1 = True  # 内循环信号
-            for modelText in listTextModel:
-                if not signLoop1:  # 跳出内循环
-                    break
-
-                if textmatch(
-                    text=modelPage.modelSpecialText.text,
-                    modelText=modelText
-                ):  # 检测到页面特征文本
-                    pageName = modelPage.pageName  # 标记当前页面名
-                    pos = modelText.pos  # 标记页面特征位置
-                    signLoop1 = False  # 跳出内循环
-                    signLoop0 = False  # 跳出外循环
+        listMatch = self.pageIndex.resolve(listTextModel, typeMatch)  # 一次扫描找出所有匹配页面
+        if listMatch:
+            pageName, modelText = listMatch[0]  # 标记当前页面名
+            pos = modelText.pos.to_model()  # 标记页面特征位置
+            if len(listMatch) > 1:
+                logger(f"页面识别存在歧义：{[name for name, _ in listMatch]}，选择{pageName}")
 
         try:
             modelPage = self.dictPages[pageName]  # 获取页面模型
-            signRecordPos = get_signRecordPos(modelPage)  # 有无记录页面特征位置
-            if signRecordPos:  # 需要记录页面特征位置
-                self.dictPages[pageName].modelSpecialText.pos = pos  # 记录页面特征位置
-
-                for modelPageRoute in modelPage.route:  # 循环记录次级页面特征位置
-                    for modelText in listTextModel:
-                        if modelText.text == modelPageRoute.modelDirectText.text:  # 检测到次级页面特征文本
-                            modelPageRoute.modelDirectText.pos = modelText.pos  # 记录次级页面特征位置
-                            break
-
-                write_pageJson(self.dictPages[pageName])
 
+            # 未记录或由其他分辨率投影而未经验证的位置，以整图识别到的实际位置覆盖
+            listText = [("page", modelPage.modelSpecialText)]
+            listText += [("route", modelPageRoute.modelDirectText) for modelPageRoute in modelPage.route]
+            for kind, modelTextRecord in listText:
+                if modelTextRecord.pos and layoutStore.is_verified(kind, pageName, modelTextRecord.text):
+                    continue
+
+                if kind == "page":  # 页面特征位置
+                    posFound = pos
+                else:  # 次级页面特征位置
+                    posFound = next(
+                        (modelText.pos.to_model() for modelText in listTextModel
+                         if modelText.text == modelTextRecord.text),
+                        None
+                    )
+                if posFound:
+                    modelTextRecord.pos = posFound
+                    layoutStore.put(kind, pageName, modelTextRecord.text, posFound)
+
+            if len(listMatch) == 1:  # 识别无歧义时记录页面视觉指纹
+                self.pageFingerprint.learn(pageName, img)
             self.pageName = pageName  # 记录当前页面名
             return self.pageName
 
@@ -798,103 +921,132 @@ class Page:
         :param pageName: 页面名
         :return: 切换成功与否
         """
-        typeMatch = self.dictPages[pageName].typeMatch
-        if typeMatch == "whole":  # 完全匹配
-            textMatch = textmatch_whole
-        else:  # 部分匹配
-            textMatch = textmatch_part
-
-        model = self.dictPages[pageName]
-        signRecordPos = get_signRecordPos(model)
-        if signRecordPos:  # 目标页面特征位置需要记录
-            pageNameReco = self.reco_page(typeMatch)
-            if pageNameReco == pageName:
-                return True
+        return self.confirm_any([pageName]) == pageName
+
+    def confirm_any(self, listPageName: list):
+        """
+        同一帧内确认多个候选页面
+        :param listPageName: 候选页面名列表，同时匹配时靠前的优先
+        :return: 匹配的页面名，均不匹配时返回None
+        """
+        listModel = [self.dictPages[pageName] for pageName in listPageName]
+        if any(get_signRecordPos(model) for model in listModel):  # 存在特征位置需要记录的页面
+            pageNameReco = self.reco_page()
+            return pageNameReco if pageNameReco in listPageName else None
+
+        # 由其他分辨率投影的特征位置未经验证，在其附近检测加识别
+        setUnverified = {
+            model.pageName for model in listModel
+            if not layoutStore.is_verified("page", model.pageName, model.modelSpecialText.text)
+        }
+        dictWindow = {model.pageName: expand_pos(model.modelSpecialText.pos) for model in listModel}  # 检测加识别的区域
+        img = self.screenshot(get_bounding_pos(list(dictWindow.values())))  # 只截取包含所有特征文本框附近区域的最小矩形
+
+        # 特征文本框已知，跳过文本检测直接识别；未变化的区域复用上次结果，其余合并为一批识别
+        listPos = [model.modelSpecialText.pos for model in listModel if model.pageName not in setUnverified]
+        dictRec = {}  # 键为区域名，值为识别结果
+        dictMiss = {}  # 键为区域名，值为需要识别的区域图像帧
+        for pos in listPos:
+            key = "rec" + str(pos)
+            if key in dictRec or key in dictMiss:
+                continue
+
+            imgCrop = img.crop(pos)
+            boolHit, modelText = self.changeDetector.lookup(key, imgCrop)
+            if boolHit:
+                dictRec[key] = modelText
             else:
-                return False
-
-        else:
-            textSpecial = model.modelSpecialText.text
-            img = self.screenshot()
-            listTextModels = ocr_crop(img, model.modelSpecialText.pos)
-            if not listTextModels:  # 未识别出文本
-                return False
+                dictMiss[key] = imgCrop
 
-            else:
-                for modelText in listTextModels:
-                    if textMatch(text=textSpecial, modelText=modelText):
-                        self.pageName = pageName
-                        return True
+        for (key, imgCrop), modelText in zip(dictMiss.items(), ocr_rec_batch(list(dictMiss.values()))):
+            self.changeDetector.store(key, imgCrop, modelText)
+            dictRec[key] = modelText
 
-                return False
+        setMatched = set()  # 匹配的页面名
+        listFallback = [model for model in listModel if model.pageName in setUnverified]  # 需要检测加识别的页面模型
+        for model in listModel:
+            if model.pageName in setUnverified:
+                continue
 
-    def __find_path_loop(self, pageName: str):
-        """
-        寻路循环体
-        :param pageName: 目标界面名
-        :return: 路径界面名列表
-        """
-        check = False  # 查找是否有所求页面
-        for modelPage in self.dictPages.values():
-            if modelPage.pageName == pageName:
-                self.route.append(pageName)
-                check = True
-                break
-
-        if check:
-            signLoop0 = True  # 外循环信号
-            for modelPage in self.dictPages.values():
-                if not signLoop0:  # 跳出外循环
-                    break
-
-                signLoop1 = True  # 内循环信号
-                for modelPageRoute in modelPage.route:
-                    if not signLoop1:  # 跳出内循环
+            textSpecial = model.modelSpecialText.text
+            textMatch = textmatch_whole if model.typeMatch == "whole" else textmatch_part
+            modelText = dictRec["rec" + str(model.modelSpecialText.pos)]
+            if modelText and textMatch(text=textSpecial, modelText=modelText):
+                setMatched.add(model.pageName)
+            elif modelText and set(textSpecial) & set(modelText.text):  # 文本相关但不匹配，文本框可能偏移
+                listFallback.append(model)
+            # 识别不到或文本无关时视为页面未显示，等待页面出现时每轮只需一次识别
+
+        if listFallback:  # 重叠的区域合并后批量检测加识别，未变化的区域复用上次结果
+            listMerged, listGroup = merge_pos([dictWindow[model.pageName] for model in listFallback])
+            listResult = [None] * len(listMerged)
+            listMiss = []  # 需要识别的合并区域序号
+            for index, pos in enumerate(listMerged):
+                boolHit, listResult[index] = self.changeDetector.lookup("det" + str(pos), img.crop(pos))
+                if not boolHit:
+                    listMiss.append(index)
+
+            listBatch = ocr_batch(img, [listMerged[index] for index in listMiss]) if listMiss else []
+            for index, result in zip(listMiss, listBatch):
+                self.changeDetector.store("det" + str(listMerged[index]), img.crop(listMerged[index]), result)
+                listResult[index] = result
+
+            for model, index in zip(listFallback, listGroup):
+                textMatch = textmatch_whole if model.typeMatch == "whole" else textmatch_part
+                for modelText in listResult[index] or []:
+                    if textMatch(text=model.modelSpecialText.text, modelText=modelText):
+                        setMatched.add(model.pageName)
+                        # 投影位置验证成功或文本框已偏移，记录实际位置
+                        if model.pageName in setUnverified or modelText.pos != model.modelSpecialText.pos:
+                            model.modelSpecialText.pos = modelText.pos.to_model()
+                            layoutStore.put("page", model.pageName, model.modelSpecialText.text, modelText.pos)
                         break
 
-                    if modelPageRoute.pageName == pageName:
-                        self.__find_path_loop(modelPage.pageName)
-                        signLoop1 = False  # 跳出内循环
-                        signLoop0 = False  # 跳出外循环
+        for pageName in listPageName:
+            if pageName in setMatched:
+                self.pageName = pageName
+                return pageName
 
-    def find_path(self, pageName: str):
+        return None
+
+    def find_path(self, pageName: str, pageStart: str = "主界面"):
         """
-        寻路并重置路径
+        查询路径表寻路
         :param pageName: 目标界面名
+        :param pageStart: 起始界面名
         :return: 路径界面名列表
         """
-        self.__find_path_loop(pageName)
-        route = self.route
+        self.routeTable.refresh(self.dictPages)  # 页面转移图变化时重建路径表
+        route = self.routeTable.find_path(pageStart, pageName)
 
-        if len(route) == 0:  # 路径长度为0
+        if not route:  # 无法到达
             raise UnknownPage(f"无法到达页面：{pageName}，请检查listDictPages预设")
 
         else:
-            self.route = []
-            route.reverse()  # 路径列表反转
             return route
 
     def reco_image(self, imageName):
         """
+        识别模板图片，已记录位置时只截取并验证位置附近的小窗口
         :param imageName: 模板图片名
         :return: 图片模型，包含图片名和位置模型
         """
-        fileName = imageName + ".json"
-        if fileName in os.listdir("json/"):  # 如果已有模板图片预设文件则读取
-            with open("json/" + fileName, 'r', encoding='utf-8') as file:
-                data = json.load(file)
-            return data
+        template = templateStore.get(imageName)
+        if template is None:  # 模板图片不存在
+            return None
 
-        img = self.screenshot()
-        imageTemplate = cv2.imread(Setting.dictTemplatePath[imageName], 0)
-        pos = image_match(img, imageTemplate)
-        if pos:
-            model = TextModel(text=imageName, pos=pos)
-            write_imageJson(model)
-            return model
+        posCached = self.positionCache.dictPos.get(imageName)
+        window = self.positionCache.get_window(imageName)
+        pos = self.positionCache.verify(self.screenshot(window), template) if window else None
+        if pos is None:  # 无记录位置或验证失败，全图搜索
+            pos = self.positionCache.search(self.screenshot(), template)
+            if pos is None:
+                return None
 
-        else:
-            return None
+        model = TextBox(imageName, pos)
+        if pos != posCached or not layoutStore.is_verified("image", "", imageName):  # 位置变化或投影位置验证成功时更新记录
+            write_imageJson(model)
+        return model
 
     def click_image(self, imageName: str):
         """
@@ -914,14 +1066,13 @@ class Page:
         """
         返回主页
         """
-        listTemplateName = ["返回主界面_黑", "返回主界面_白"]
-        for imageName in listTemplateName:
-            sign = self.click_image(imageName)
-            if sign:
-                self.wait_page(pageName="主界面")
-                return
+        listMatch = match_many(self.screenshot(), ["返回主界面_黑", "返回主界面_白"])
+        if not listMatch:
+            raise UnknownPage("无法返回主界面")
 
-        raise UnknownPage("无法返回主界面")
+        _, _, pos = max(listMatch, key=lambda match: match[1])  # 两种按钮同时匹配时点击相关系数更高的
+        self.control.random_click(pos)
+        self.wait_page(pageName="主界面")
 
     def confirm_loop(self, pageName: str):
         """
@@ -929,64 +1080,101 @@ class Page:
         :param pageName: 目标界面名
         :return: 确认成功与否
         """
-        for _ in range(self.limitRecoTimes):
-            if self.confirm_page(pageName):
-                return True  # 确认成功
+        try:
+            self.waiter.wait(
+                lambda: self.confirm_page(pageName),
+                timeout=self.limitRecoTimes * self.limitRecoCD,
+                description=f"确认界面{pageName}",
+                attempts=self.limitRecoTimes  # 单次确认耗时较长时仍保证尝试次数
+            )
+        except WaitTimeout:
+            return False  # 确认失败
+
+        return True  # 确认成功
+
+    def verify_text(self, kind: str, owner: str, modelText: TextModel) -> bool:
+        """
+        在投影位置附近识别文本，验证由其他分辨率投影得到的位置
+        :param kind: 布局仓库中的类别
+        :param owner: 所属页面或任务名
+        :param modelText: 文本模型，验证成功时位置更新为实际位置，失败时位置置空
+        :return: 验证成功与否
+        """
+        if layoutStore.is_verified(kind, owner, modelText.text):
+            return True
 
-            time.sleep(self.limitRecoCD)
+        window = expand_pos(modelText.pos)
+        for modelTextFound in ocr_crop(self.screenshot(window), window) or []:
+            if textmatch_whole(modelText.text, modelTextFound):
+                modelText.pos = modelTextFound.pos.to_model()
+                layoutStore.put(kind, owner, modelText.text, modelText.pos)
+                return True
 
-        return False  # 确认失败
+        layoutStore.discard(kind, owner, modelText.text)
+        modelText.pos = None
+        return False
 
     def change(self, pageNow: str, pageNext):
         """
         切换界面
         :param pageNow: 当前界面名
         :param pageNext: 下一个界面名
-
+        :raise WaitTimeout: 超过Setting.timeoutWait仍未到达目标界面时抛出
         """
         modelPage = self.dictPages[pageNow]
-        pos = None  # 下一界面指向文本位置模型
+        modelDirectText = None  # 下一界面指向文本模型
 
-        # 寻找指向文本位置
+        # 寻找指向文本
         for modelPageRoute in modelPage.route:
             if pageNext == modelPageRoute.pageName:
-                pos = modelPageRoute.modelDirectText.pos
+                modelDirectText = modelPageRoute.modelDirectText
                 break
 
         # 由于战役推进可能会指向3个界面，所以设立此项
         listSpecialPage = ['剧情战役', '模拟作战']
+        listTarget = [pageNext] + (
+            [pageName for pageName in listSpecialPage if pageName != pageNext] if pageNext in listSpecialPage else []
+        )
 
-        # 切换界面
-        while True:  # 仍处于当前界面
-            if self.confirm_page(pageNow):  # 确认界面
-                self.control.random_click(pos)
-                time.sleep(self.limitClickCD)
+        # 切换界面，每轮只截一次图同时确认当前界面与目标界面
+        def step():
+            pageName = self.confirm_any(listTarget + [pageNow])
+            if pageName in listTarget:  # 已到达目标界面
+                return pageName
+
+            if pageName == pageNow and modelDirectText.pos:  # 仍处于当前界面
+                if self.verify_text("route", pageNow, modelDirectText):  # 验证失败时位置置空，下次确认界面时重新记录
+                    self.control.random_click(modelDirectText.pos)
+                    time.sleep(self.limitClickCD)
+            return None
 
-            if self.confirm_page(pageNext):  # 确认界面
-                return
-            elif pageNext in listSpecialPage:  # 特殊界面
-                for pageName in listSpecialPage:  # 特殊界面
-                    if self.confirm_page(pageName):  # 确认界面
-                        return
+        timeStart = time.time()
+        pageName = self.waiter.wait(step, description=f"{pageNow} -> {pageNext}")
+        if pageName == pageNext:
+            self.edgeStats.record(pageNow, pageNext, time.time() - timeStart)  # 记录切换耗时
 
     def locate(self, pageName: str):
         """
         导航至目标界面
         :param pageName:
         :return:
+        :raise WaitTimeout: 切换界面超时时抛出
         """
-        route = self.find_path(pageName)  # 寻路
-        self.reco_page()  # 识别当前界面
+        self.pageName = None
+        pageNow = self.confirm_any(self.find_path(pageName))  # 一帧内确认当前界面是否在主界面出发的路径中
+        if not pageNow:
+            pageNow = self.pageName or self.reco_page()  # confirm_any内已整帧识别出路径外的界面时直接使用
 
-        if self.pageName in route:  # 当前界面是否在寻路路径中
-            route = route[route.index(self.pageName):]  # 从当前界面开始截取寻路路径
-
-        else:  # 不在寻路路径中，返回主界面
+        self.routeTable.refresh(self.dictPages)
+        route = self.routeTable.find_path(pageNow, pageName)  # 从当前界面出发的最短路径
+        if not route:  # 当前界面无法到达目标界面，返回主界面
             self.retrun_to_mainPage()
             signConfirm = self.confirm_loop('主界面')
             if not signConfirm:
                 return self.locate(pageName)
 
+            route = self.find_path(pageName)
+
         # 切换界面
         for index, routePageName in enumerate(route):
             if index + 1 >= len(route):  # 判断是否为最后一个界面
@@ -994,70 +1182,110 @@ class Page:
 
             self.change(route[index], route[index + 1])
 
-    def wait_page(self, pageName: str):
+    def wait_any(self, listPageName: list, timeout: float = None) -> str:
+        """
+        等待多个界面中的任意一个出现
+        :param listPageName: 界面名列表，同时出现时靠前的优先
+        :param timeout: 超时时间（秒），为空时使用Setting.timeoutWait，为0时不限时
+        :return: 出现的界面名
+        :raise WaitTimeout: 超时时抛出
+        """
+        if len(listPageName) == 1 and self.pipeline and not get_signRecordPos(self.dictPages[listPageName[0]]):
+            return self.__wait_pipeline(listPageName[0], timeout)  # 特征位置已记录时交给流水线识别
+
+        return self.waiter.wait(
+            lambda: self.confirm_any(listPageName),
+            timeout=timeout,
+            description=f"等待界面{listPageName}"
+        )
+
+    def wait_page(self, pageName: str, timeout: float = None):
         """
-        无限循环等待目标界面出现
+        等待目标界面出现
         :param pageName:
+        :param timeout: 超时时间（秒），为空时使用Setting.timeoutWait，为0时不限时
+        :raise WaitTimeout: 超时时抛出
         """
-        while True:
-            if self.confirm_page(pageName):  # 确认界面
-                return
+        self.wait_any([pageName], timeout)
+
+    def __wait_pipeline(self, pageName: str, timeout: float = None) -> str:
+        """
+        持续消费流水线的最新识别结果，等待目标界面出现
+        :param pageName: 目标界面名
+        :param timeout: 超时时间（秒），为空时使用Setting.timeoutWait，为0时不限时
+        """
+        model = self.dictPages[pageName]
+        textMatch = textmatch_whole if model.typeMatch == "whole" else textmatch_part
+        timeout = Setting.timeoutWait if timeout is None else timeout
+        deadline = time.time() + timeout if timeout else None
+
+        timeLast = time.time()  # 只接受此后截取的帧
+        pos = model.modelSpecialText.pos
+        if not layoutStore.is_verified("page", pageName, model.modelSpecialText.text):
+            pos = expand_pos(pos)  # 投影位置可能有偏差，扩大监视区域
+        self.pipeline.watch(pos)
+        try:
+            while True:
+                result = self.pipeline.latest(after=timeLast, timeout=deadline - time.time() if deadline else None)
+                if result is None:
+                    raise WaitTimeout(f"等待超时（{timeout}s）：等待界面{pageName}")
+
+                timeLast, listResult = result
+                for text, x1, y1, x2, y2 in listResult:
+                    modelText = TextBox(text, Rect(x1, y1, x2, y2))
+                    if textMatch(text=model.modelSpecialText.text, modelText=modelText):
+                        self.pageName = pageName
+                        return pageName
+
+        finally:
+            self.pipeline.pause()
 
-    def confirm_click_change(self, pageName: str, func, **kwargs):
+    def confirm_click_change(self, pageName: str, func, timeout: float = None, **kwargs):
         """
         循环确认界面已切换，未切换则重复之前的点击
         :param pageName: 切换后的界面名
         :param func: 切换操作函数
+        :param timeout: 超时时间（秒），为空时使用Setting.timeoutWait，为0时不限时
         :param kwargs: 切换操作函数的参数
+        :raise WaitTimeout: 超时时抛出
         """
-        while not self.confirm_page(pageName):  # 确认界面
+        def step():
+            if self.confirm_page(pageName):  # 确认界面
+                return True
+
             func(**kwargs)
             time.sleep(self.limitClickCD)
+            return False
+
+        self.waiter.wait(step, timeout=timeout, description=f"点击切换至{pageName}")
 
 
 class TaskPage(Page):
-    def __init__(self, taskName):
-        super().__init__()
+    taskName = None  # 任务名
+    pageTask = None  # 任务所在界面，调度器据此安排任务顺序
+
+    def __init__(self, taskName, base: Page = None):
+        """
+        :param taskName: 任务名
+        :param base: 已初始化的页面，传入时复用其窗口与识别状态
+        """
+        super().__init__(base=base)
         self.taskName = taskName
-        self.listTextModel = []  # 文本模型列表
+        self.delay = None  # 任务要求推迟再次执行的秒数，为空时按默认间隔
         self.dictText = self.read_taskJson()
 
     def read_taskJson(self):
         """
-        读取任务界面json文件
+        读取任务界面已记录的文本位置
         """
-        dictText = {}
-        try:
-            with open("json/task/" + self.taskName + ".json", 'r', encoding='utf-8') as file:
-                listTextModel = json.load(file)
-
-            for modelText in listTextModel:
-                modelText = TextModel(**modelText)
-                dictText[modelText.text] = modelText.pos
-
-        except FileNotFoundError:
-            pass
-
-        finally:
-            return dictText
+        return layoutStore.get_owner("task", self.taskName)
 
-    def write_taskJson(self):
+    def write_taskJson(self, modelText):
         """
-        写入任务界面json文件
+        将新识别到的文本位置写入布局仓库
+        :param modelText: 文本模型
         """
-        # 将列表里的文本模型解成字典并传入jsonTextModels列表
-        jsonTextModels = []
-        for modelText in self.listTextModel:
-            data = modelText.dict()
-            jsonTextModels.append(data)
-
-        dirpath = 'json/task'
-        if not os.path.exists(dirpath):
-            os.makedirs(dirpath)
-
-        file = os.path.join(dirpath, self.taskName + '.json')
-        with open(file, 'w', encoding='utf-8') as f:
-            json.dump(jsonTextModels, f, indent=4, ensure_ascii=False)  # 写入json文件
+        layoutStore.put("task", self.taskName, modelText.text, modelText.pos)
 
     def click_text(self, text: str) -> bool:
         """
@@ -1065,12 +1293,17 @@ class TaskPage(Page):
         :param text: 目标文本
         :return: 点击成功返回True，失败返回False
         """
-        img = self.screenshot()
         check = False  # 检测是否具有文本
         try:
             pos = self.dictText[text]
-            model = TextModel(text=text, pos=pos)
-            listTextModel = ocr_crop(img, model.pos)
+            if not layoutStore.is_verified("task", self.taskName, text):  # 投影位置首次使用时验证
+                modelText = TextBox(text, pos)
+                if not self.verify_text("task", self.taskName, modelText):
+                    del self.dictText[text]
+                    raise KeyError(text)  # 验证失败时全图重新识别
+                pos = self.dictText[text] = modelText.pos
+
+            listTextModel = self.ocr_region(pos)
             if listTextModel and textmatch_whole(text, listTextModel[0]):
                 check = True
 
@@ -1084,13 +1317,10 @@ class TaskPage(Page):
             for modelText in listTextModel:
                 if textmatch_whole(text, modelText):
                     self.dictText[modelText.text] = modelText.pos
-                    self.listTextModel.append(modelText)
+                    self.write_taskJson(modelText)  # 全新检测到目标文本
                     check = True
                     break
 
-            if check:  # 全新检测到目标文本
-                self.write_taskJson()
-
         finally:
             if check:
                 self.control.random_click(self.dictText[text])
@@ -1117,7 +1347,7 @@ class TaskPage(Page):
         self.wait_page('作战中')
         self.auto_battle()
 
-        self.wait_page('任务完成')
+        self.wait_page('任务完成', timeout=Setting.timeoutBattle)  # 战斗耗时较长
 
         self.confirm_click_change(
             pageName="伤害统计",
@@ -1138,15 +1368,16 @@ def init_task(cls):
 @init_task
 class BanZuBuji(TaskPage):
     taskName = "班组补给"
+    pageTask = "班组补给"  # 任务所在界面
 
-    def __init__(self):
-        super().__init__(self.taskName)
+    def __init__(self, base: Page = None):
+        super().__init__(self.taskName, base)
 
     def run(self):
         """
         收获
         """
-        self.locate('班组补给')
+        self.locate(self.pageTask)
         sign = self.click_text('领取全部')
         if not sign:  # 未找到领取全部
             return
@@ -1162,9 +1393,10 @@ class BanZuBuji(TaskPage):
 @init_task
 class PaiQian(TaskPage):  # done
     taskName = "派遣"
+    pageTask = "调度室"  # 任务所在界面
 
-    def __init__(self):
-        super().__init__(self.taskName)
+    def __init__(self, base: Page = None):
+        super().__init__(self.taskName, base)
 
     def reward(self):
         sign = self.click_image("收获_派遣")
@@ -1179,7 +1411,7 @@ class PaiQian(TaskPage):  # done
             logger(f"{self.taskName} 周奖励已已领取")
 
     def run(self):
-        self.locate('调度室')
+        self.locate(self.pageTask)
         sign = self.click_text('一键领取')
         if sign:
             self.wait_page("派遣完成")
@@ -1190,18 +1422,16 @@ class PaiQian(TaskPage):  # done
 
         self.reward()
 
-        self.retrun_to_mainPage()
-        self.wait_page("主界面")
-
 @init_task
 class QingBaoCuBei(TaskPage):  # done
     taskName = "情报储备"
+    pageTask = "情报储备"  # 任务所在界面
 
-    def __init__(self):
-        super().__init__(self.taskName)
+    def __init__(self, base: Page = None):
+        super().__init__(self.taskName, base)
 
     def run(self):
-        self.locate('情报储备')
+        self.locate(self.pageTask)
         time.sleep(1)
         self.click_text('最大')
         time.sleep(1)
@@ -1216,12 +1446,13 @@ class ZiYuanShengChan(TaskPage):  # done
     资源生产done
     """
     taskName = "资源生产"
+    pageTask = "资源生产"  # 任务所在界面
 
-    def __init__(self):
-        super().__init__(self.taskName)
+    def __init__(self, base: Page = None):
+        super().__init__(self.taskName, base)
 
     def run(self):
-        self.locate('资源生产')
+        self.locate(self.pageTask)
 
         self.click_text('收取')
 
@@ -1236,9 +1467,10 @@ class ZiYuanShengChan(TaskPage):  # done
 @init_task
 class BanZuYaoWu(TaskPage):
     taskName = "班组要务"
+    pageTask = "班组要务"  # 任务所在界面
 
-    def __init__(self):
-        super().__init__(self.taskName)
+    def __init__(self, base: Page = None):
+        super().__init__(self.taskName, base)
 
     def close(self):
         templateName = "关闭要务"
@@ -1246,7 +1478,7 @@ class BanZuYaoWu(TaskPage):
         self.wait_page('班组')  # 等待关闭动画结束
 
     def run(self):
-        self.locate('班组要务')
+        self.locate(self.pageTask)
         sign = self.click_text('开始作战')
         if not sign:
             logger(f"{self.taskName} 已完成")
@@ -1291,80 +1523,93 @@ class PlayerPanel:
 @init_task
 class ShiBingYanXi(TaskPage):
     taskName = "实兵演习"
+    pageTask = "实兵演习"  # 任务所在界面
 
-    def __init__(self):
-        super().__init__(self.taskName)
+    def __init__(self, base: Page = None):
+        super().__init__(self.taskName, base)
         self.dictPlayer = {}
         self.modelTextAttack = self.read_taskJson_attack()
 
     def read_taskJson_attack(self):
         """
-        读取进攻界面json文件
+        读取进攻界面已记录的进攻按钮
         """
-        modelText = None
-        try:
-            with open("json/task/演习进攻.json", 'r', encoding='utf-8') as file:
-                modelText = json.load(file)
-
-            modelText = TextModel(**modelText)
-
-        except FileNotFoundError:
-            pass
-
-        finally:
-            return modelText
+        for text, pos in layoutStore.get_owner("task", "演习进攻").items():
+            return TextModel(text=text, pos=pos)
+        return None
 
     def write_taskJson_attack(self):
         """
-        写入进攻界面json文件
+        写入进攻界面的进攻按钮
         """
-        data = self.modelTextAttack.dict()
-        data = json.dumps(data, indent=4, ensure_ascii=False)  # 确保中文不会转义
-        dirpath = 'json/task'
-        if not os.path.exists(dirpath):
-            os.makedirs(dirpath)
+        layoutStore.put("task", "演习进攻", self.modelTextAttack.text, self.modelTextAttack.pos)
 
-        file = dirpath + "/演习进攻.json"
-        with open(file, 'w', encoding='utf-8') as file:
-            file.write(data)  # 写入json文件
-
-    def check_battletimes(self):
+    @staticmethod
+    def get_pos_battletimes() -> PositionModel:
         """
-        识别剩余战斗次数
-        :return:
+        战斗次数区域
         """
-        img = self.screenshot()
-
-        # 截取战斗次数区域
         region = (0.95, 0.03, 0.98, 0.06)
-        pos = PositionModel(
+        return PositionModel(
             x1=int(Setting.screenWidth * region[0]),
             y1=int(Setting.screenHeight * region[1]),
             x2=int(Setting.screenWidth * region[2]),
             y2=int(Setting.screenHeight * region[3])
         )
 
-        listTextModel = ocr_crop(img, pos)
-        return int(listTextModel[0].text[0])
-
-    def check_refreshtimes(self):
+    @staticmethod
+    def get_pos_refreshtimes() -> PositionModel:
         """
-        识别刷新次数
-        :return: 刷新次数
+        刷新次数区域
         """
-        img = self.screenshot()
-
-        # 截取刷新次数区域
         region = (0.83, 0.93, 0.89, 0.96)
-        pos = PositionModel(
+        return PositionModel(
             x1=int(Setting.screenWidth * region[0]),
             y1=int(Setting.screenHeight * region[1]),
             x2=int(Setting.screenWidth * region[2]),
             y2=int(Setting.screenHeight * region[3])
         )
 
-        listTextModel = ocr_crop(img, pos)
-        return int(listTextModel[0].text[-3])
+    def check_battletimes(self):
+        """
+        识别剩余战斗次数
+        :return:
+        """
+        return int(self.read_digits(self.get_pos_battletimes())[0])
+
+    def check_refreshtimes(self):
+        """
+        识别刷新次数
+        :return: 刷新次数
+        """
+        return int(self.read_digits(self.get_pos_refreshtimes())[-3])
+
+    def check_times(self) -> tuple:
+        """
+        同一帧内批量识别剩余战斗次数与刷新次数
+        :return: (战斗次数, 刷新次数)
+        """
+        posBattle = self.get_pos_battletimes()
+        posRefresh = self.get_pos_refreshtimes()
+        img = self.screenshot(PositionModel(
+            x1=min(posBattle.x1, posRefresh.x1),
+            y1=min(posBattle.y1, posRefresh.y1),
+            x2=max(posBattle.x2, posRefresh.x2),
+            y2=max(posBattle.y2, posRefresh.y2)
+        ))  # 只截取包含两个区域的最小矩形
+
+        textBattle = digitRecognizer.read(img.crop(posBattle))
+        textRefresh = digitRecognizer.read(img.crop(posRefresh))
+        if textBattle is None or textRefresh is None:  # 模板无法识别时批量OCR并学习模板
+            listBattle, listRefresh = ocr_batch(img, [posBattle, posRefresh])
+            textBattle = listBattle[0].text
+            textRefresh = listRefresh[0].text
+            if len(listBattle) == 1:
+                digitRecognizer.learn(img.crop(posBattle), textBattle)
+            if len(listRefresh) == 1:
+                digitRecognizer.learn(img.crop(posRefresh), textRefresh)
+
+        return int(textBattle[0]), int(textRefresh[-3])
 
     def reco_player(self):
         """
@@ -1373,15 +1618,15 @@ class ShiBingYanXi(TaskPage):
         """
         img = self.screenshot()
         dictPlayers = {}
-        for index in range(1, 6):  # 5个玩家面板
-            player = PlayerPanel(index=index)
-
-            listTextModel = ocr_crop(img, player.pos)
+        listPanel = [PlayerPanel(index=index) for index in range(1, 6)]  # 5个玩家面板
+        listResult = ocr_batch(img, [player.pos for player in listPanel])  # 所有面板一次批量识别
+        for index, (player, listTextModel) in enumerate(zip(listPanel, listResult), start=1):
             state = True
             capability = 0
-            for modelText in listTextModel:
+            for modelText in listTextModel or []:
                 try:
                     capability = int(modelText.text)
+                    digitRecognizer.learn(img.crop(modelText.pos), modelText.text)  # 战力数字用于积累数字模板
 
                 except ValueError:
                     if textmatch_whole("挑战成功", modelText):  # 识别出挑战成功
@@ -1420,6 +1665,8 @@ class ShiBingYanXi(TaskPage):
                 self.control.random_click(modelPlayer.pos)
 
                 self.wait_page("基础防守演习")
+                if self.modelTextAttack and not self.verify_text("task", "演习进攻", self.modelTextAttack):
+                    self.modelTextAttack = None  # 投影位置验证失败，重新识别
                 if not self.modelTextAttack:
                     img = self.screenshot()
                     listTextModel = ocr_textAll(img)
@@ -1434,14 +1681,14 @@ class ShiBingYanXi(TaskPage):
                 self.battle(typeBattle="yanxi")
                 self.wait_page("进攻选择")
 
-        timesBattle = self.check_battletimes()
+        timesBattle, timesRefresh = self.check_times()
         if timesBattle == 0:
             logger(f"{self.taskName} 已完成")
             return
 
-        timesRefresh = self.check_refreshtimes()
         if timesRefresh == 0:  # 刷新次数为0
             logger(f"刷新次数不足，任务{self.taskName}推迟1小时")
+            self.delay = 3600
             return
 
         else:  # 仍有刷新次数
@@ -1464,7 +1711,7 @@ class ShiBingYanXi(TaskPage):
             )
 
     def run(self):
-        self.locate('实兵演习')
+        self.locate(self.pageTask)
 
         timesBattle = self.check_battletimes()
         if timesBattle == 0:
@@ -1479,23 +1726,25 @@ class ShiBingYanXi(TaskPage):
 
 class BuJiZuoZhan(TaskPage):
     taskName = "补给作战"
+    pageTask = "补给作战"  # 任务所在界面
 
-    def __init__(self):
-        super().__init__(self.taskName)
+    def __init__(self, base: Page = None):
+        super().__init__(self.taskName, base)
 
     def run(self):
-        self.locate('补给作战')
+        self.locate(self.pageTask)
 
 
 @init_task
 class WeiTuo(TaskPage):
     taskName = "委托"
+    pageTask = "委托"  # 任务所在界面
 
-    def __init__(self):
-        super().__init__(self.taskName)
+    def __init__(self, base: Page = None):
+        super().__init__(self.taskName, base)
 
     def run(self):
-        self.locate('委托')
+        self.locate(self.pageTask)
 
         sign = self.click_text("一键领取")
         if not sign:
@@ -1518,23 +1767,25 @@ class WeiTuo(TaskPage):
 @init_task
 class XiuXi(TaskPage):
     taskName = "休息"
+    pageTask = "休息室"  # 任务所在界面
 
-    def __init__(self):
-        super().__init__(self.taskName)
+    def __init__(self, base: Page = None):
+        super().__init__(self.taskName, base)
 
     def run(self):
-        self.locate('休息室')
+        self.locate(self.pageTask)
 
 
 @init_task
 class MeiRiLiBao(TaskPage):
     taskName = "每日礼包"
+    pageTask = "新品上架"  # 任务所在界面
 
-    def __init__(self):
-        super().__init__(self.taskName)
+    def __init__(self, base: Page = None):
+        super().__init__(self.taskName, base)
 
     def run(self):
-        self.locate('新品上架')
+        self.locate(self.pageTask)
 
         self.click_text("品质甄选")
         time.sleep(self.limitClickCD)
@@ -1558,19 +1809,18 @@ class MeiRiLiBao(TaskPage):
 @init_task
 class HuoDongKunNan(TaskPage):
     taskName = "活动困难"
+    pageTask = "战役困难模式"  # 任务所在界面
     activityName = "远日点"
     battleName = "DF-9-5"
 
-    def __init__(self):
-        super().__init__(self.taskName)
+    def __init__(self, base: Page = None):
+        super().__init__(self.taskName, base)
 
     def reco_battlepos(self):
         """
         识别活动战斗位置
         :return:
         """
-        img = self.screenshot()
-
         # 截取战斗次数区域
         region = (0, 0.47, 1, 0.51)
         pos = PositionModel(
@@ -1580,7 +1830,7 @@ class HuoDongKunNan(TaskPage):
             y2=int(Setting.screenHeight * region[3])
         )
 
-        listTextModel = ocr_crop(img, pos)
+        listTextModel = self.ocr_region(pos)
         if not listTextModel:
             return None
 
@@ -1602,8 +1852,6 @@ class HuoDongKunNan(TaskPage):
         识别战斗次数
         :return:
         """
-        img = self.screenshot()
-
         # 截取战斗次数区域
         region = (0.95, 0.03, 0.97, 0.06)
         pos = PositionModel(
@@ -1613,11 +1861,10 @@ class HuoDongKunNan(TaskPage):
             y2=int(Setting.screenHeight * region[3])
         )
 
-        listTextModel = ocr_crop(img, pos)
-        return int(listTextModel[0].text)
+        return int(self.read_digits(pos))
 
     def run(self):
-        self.locate("战役困难模式")
+        self.locate(self.pageTask)
 
         timesBattle = self.check_battletimes()
 
@@ -0,0 +1,85 @@
+import atexit
+import os
+import threading
+
+from constants import Setting
+from utils import logger
+
+
+def write_atomic(path: str, data: bytes):
+    """
+    原子写入文件，先写入临时文件再替换，中途崩溃不会留下写了一半的文件
+    :param path: 文件路径
+    :param data: 文件内容
+    """
+    dirpath = os.path.dirname(path)
+    if dirpath and not os.path.exists(dirpath):
+        os.makedirs(dirpath)
+
+    pathTemp = path + ".tmp"
+    with open(pathTemp, 'wb') as file:
+        file.write(data)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(pathTemp, path)
+
+
+class WriteBehind:
+    """
+    延迟写入，识别流程中只标记需要写入的数据，由后台线程定时合并写入，退出时写入剩余数据
+    """
+
+    def __init__(self, interval: float = None):
+        """
+        :param interval: 后台写入间隔（秒）
+        """
+        self.interval = Setting.flushInterval if interval is None else interval
+        self.dictDirty = {}  # 键为写入目标，值为写入函数，同一目标多次标记只写入一次
+        self.lock = threading.Lock()
+        self.event = threading.Event()  # 停止信号
+        self.thread = None  # 后台写入线程
+        atexit.register(self.stop)
+
+    def mark(self, key, func):
+        """
+        标记需要写入的数据
+        :param key: 写入目标，如文件路径
+        :param func: 写入函数，写入时调用，应写入调用时的最新数据
+        """
+        with self.lock:
+            self.dictDirty[key] = func
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.__run, daemon=True)
+                self.thread.start()
+
+    def flush(self):
+        """
+        立即写入所有已标记的数据
+        """
+        with self.lock:
+            dictDirty, self.dictDirty = self.dictDirty, {}
+
+        for key, func in dictDirty.items():
+            try:
+                func()
+            except Exception as e:
+                logger(f"写入失败：{key}，{e}")
+
+    def stop(self):
+        """
+        停止后台线程并写入剩余数据
+        """
+        self.event.set()
+        if self.thread:
+            self.thread.join()
+        self.flush()
+
+    def __run(self):
+        """
+        后台写入线程
+        """
+        while not self.event.wait(self.interval):
+            self.flush()
+
+
+writeBehind = WriteBehind()
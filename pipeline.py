@@ -0,0 +1,212 @@
+import atexit
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import cv2
+import numpy as np
+
+from constants import Setting
+from utils import logger
+
+dictShared = {}  # 工作进程内已连接的共享内存，键为共享内存名
+ocrPipeline = None  # 进程内共用的识别流水线，首次使用时创建
+lockPipeline = threading.Lock()
+
+
+def ocr_shared(name: str, shape: tuple, x: int, y: int) -> list:
+    """
+    工作进程内识别共享内存中的帧
+    :param name: 共享内存名
+    :param shape: 帧的形状
+    :param x: 帧左上角在画面中的横坐标
+    :param y: 帧左上角在画面中的纵坐标
+    :return: (文本, x1, y1, x2, y2)元组列表
+    """
+    from utils import get_ocr
+
+    if name not in dictShared:
+        dictShared[name] = shared_memory.SharedMemory(name=name)
+    im = np.ndarray(shape, dtype=np.uint8, buffer=dictShared[name].buf)
+    rgb = cv2.cvtColor(im, cv2.COLOR_BGRA2RGB)  # 复制出帧后共享内存即可被复用
+
+    listResults = get_ocr()(rgb)[0]
+    listReturn = []
+    for box, text, confidence in listResults or []:
+        if confidence > Setting.threshold:
+            listReturn.append((text, int(box[0][0]) + x, int(box[0][1]) + y, int(box[2][0]) + x, int(box[2][1]) + y))
+    return listReturn
+
+
+class OCRPipeline:
+    """
+    截图与识别流水线，截图线程将帧写入共享内存交给识别进程池，截图N+1与识别N并行
+    """
+
+    def __init__(self, grab, workers: int = 2, slots: int = None):
+        """
+        :param grab: 截图函数，参数为位置模型，返回截图帧
+        :param workers: 识别进程数
+        :param slots: 共享内存帧槽数，即同时在途的帧数上限，默认比进程数多一个
+        """
+        self.grab = grab
+        self.workers = workers
+        self.slots = slots or workers + 1
+        self.executor = None  # 识别进程池
+        self.listShared = []  # 共享内存帧槽
+        self.size = None  # 帧槽字节数，按启动时的分辨率计算
+        self.queueFree = queue.Queue()  # 空闲帧槽序号
+        self.condition = threading.Condition()
+        self.thread = None  # 截图线程
+        self.running = False  # 流水线是否运行
+        self.pos = None  # 监视区域
+        self.generation = 0  # 监视区域版本，区域变化后丢弃旧区域的结果
+        self.seq = 0  # 帧序号
+        self.result = None  # 最新结果(帧序号, 截图时间, 区域版本, 识别结果)
+        self.error = None  # 识别进程抛出的异常，由latest重新抛出
+
+    def start(self):
+        """
+        启动识别进程池，分辨率变化后重建帧槽
+        """
+        size = Setting.screenWidth * Setting.screenHeight * 4
+        if self.executor:
+            if size == self.size:
+                return
+            self.stop()  # 原帧槽容纳不下新分辨率的帧
+
+        self.size = size
+        self.listShared = [shared_memory.SharedMemory(create=True, size=size) for _ in range(self.slots)]
+        for index in range(self.slots):
+            self.queueFree.put(index)
+        self.executor = ProcessPoolExecutor(max_workers=self.workers)
+
+    def watch(self, pos=None):
+        """
+        开始持续截图识别指定区域
+        :param pos: 位置模型，为空时识别整个画面
+        """
+        self.start()
+        with self.condition:
+            self.pos = pos
+            self.generation += 1
+            self.result = None
+            self.error = None
+
+        if not self.running:
+            self.running = True
+            self.thread = threading.Thread(target=self.__produce, daemon=True)
+            self.thread.start()
+
+    def pause(self):
+        """
+        停止截图，进程池保留以便下次使用
+        """
+        self.running = False
+        if self.thread:
+            self.thread.join()
+            self.thread = None
+
+    def stop(self):
+        """
+        停止流水线并释放进程池与共享内存
+        """
+        self.pause()
+        if self.executor:
+            self.executor.shutdown(wait=True)
+            self.executor = None
+
+        for shared in self.listShared:
+            shared.close()
+            shared.unlink()
+        self.listShared = []
+        self.size = None
+        self.queueFree = queue.Queue()
+
+    def __produce(self):
+        """
+        截图线程，帧槽全部在途时阻塞，从而限制队列长度
+        """
+        while self.running:
+            try:
+                index = self.queueFree.get(timeout=0.1)
+            except queue.Empty:
+                continue
+
+            with self.condition:
+                pos = self.pos
+                generation = self.generation
+
+            timeCapture = time.time()
+            frame = self.grab(pos)
+            height, width = frame.shape
+            im = np.ndarray((height, width, 4), dtype=np.uint8, buffer=self.listShared[index].buf)
+            im[:] = frame.bgra
+            self.seq += 1
+
+            future = self.executor.submit(ocr_shared, self.listShared[index].name, im.shape, frame.x, frame.y)
+            future.add_done_callback(
+                lambda f, index=index, seq=self.seq, timeCapture=timeCapture, generation=generation:
+                self.__consume(f, index, seq, timeCapture, generation)
+            )
+
+    def __consume(self, future, index: int, seq: int, timeCapture: float, generation: int):
+        """
+        识别完成回调，归还帧槽并保存最新结果
+        """
+        self.queueFree.put(index)
+        try:
+            listResult = future.result()
+        except Exception as e:  # 识别失败时唤醒等待者，由latest抛出异常
+            logger(f"识别进程执行失败：{e}")
+            with self.condition:
+                if generation == self.generation:
+                    self.error = e
+                    self.condition.notify_all()
+            return
+
+        with self.condition:
+            if generation != self.generation:  # 监视区域已变化
+                return
+            if self.result and self.result[0] > seq:  # 已有更新的结果
+                return
+
+            self.result = (seq, timeCapture, generation, listResult)
+            self.condition.notify_all()
+
+    def latest(self, after: float = 0, timeout: float = None):
+        """
+        获取截图时间晚于after的最新识别结果
+        :param after: 时间戳
+        :param timeout: 等待超时时间（秒），为空时一直等待
+        :return: (截图时间, (文本, x1, y1, x2, y2)元组列表)，超时返回None
+        :raise Exception: 识别进程执行失败时抛出其异常
+        """
+        with self.condition:
+            signReady = self.condition.wait_for(
+                lambda: self.error is not None or (self.result is not None and self.result[1] > after),
+                timeout=timeout
+            )
+            if self.error is not None:
+                error, self.error = self.error, None
+                raise error
+            if not signReady:
+                return None
+            return self.result[1], self.result[3]
+
+
+def get_pipeline(grab) -> OCRPipeline:
+    """
+    获取进程内共用的识别流水线，首次调用时创建，进程退出时释放进程池与共享内存
+    :param grab: 截图函数，每次调用时更新为调用者的截图函数
+    :return: 识别流水线
+    """
+    global ocrPipeline
+    with lockPipeline:
+        if ocrPipeline is None:
+            ocrPipeline = OCRPipeline(grab, Setting.ocrWorkers)
+            atexit.register(ocrPipeline.stop)
+        ocrPipeline.grab = grab
+    return ocrPipeline
@@ -0,0 +1,182 @@
+import heapq
+import json
+import statistics
+import threading
+
+from constants import Setting
+from persist import write_atomic, writeBehind
+
+
+class EdgeStats:
+    """
+    页面切换耗时统计，持久化记录每条页面转移边的实测耗时
+    """
+
+    def __init__(self, path: str = "json/route/edge.json", limitSamples: int = 20):
+        """
+        :param path: 统计文件路径
+        :param limitSamples: 每条边保留的最近样本数
+        """
+        self.path = path
+        self.limitSamples = limitSamples
+        self.dictSamples = {}  # 键为当前页面名，值为{下一页面名: 耗时样本列表}
+        self.version = 0  # 统计版本，记录新样本后递增
+        self.lock = threading.Lock()  # 后台写入时保护样本
+        try:
+            with open(self.path, 'r', encoding='utf-8') as file:
+                self.dictSamples = json.load(file)
+        except FileNotFoundError:
+            pass
+
+    def record(self, pageNow: str, pageNext: str, elapsed: float):
+        """
+        记录一次成功切换的耗时
+        :param pageNow: 当前页面名
+        :param pageNext: 下一页面名
+        :param elapsed: 耗时（秒）
+        """
+        with self.lock:
+            listSamples = self.dictSamples.setdefault(pageNow, {}).setdefault(pageNext, [])
+            listSamples.append(round(elapsed, 3))
+            del listSamples[:-self.limitSamples]
+        self.version += 1
+        writeBehind.mark(self.path, self.save)
+
+    def save(self):
+        """
+        写入统计文件
+        """
+        with self.lock:
+            data = json.dumps(self.dictSamples, indent=4, ensure_ascii=False)
+        write_atomic(self.path, data.encode('utf-8'))
+
+    def get_cost(self, pageNow: str, pageNext: str) -> float:
+        """
+        获取页面转移边的代价
+        :return: 实测耗时中位数，无样本时为默认代价
+        """
+        listSamples = self.dictSamples.get(pageNow, {}).get(pageNext)
+        if not listSamples:
+            return Setting.defaultEdgeCost
+        return statistics.median(listSamples)
+
+    def __str__(self):
+        listEdge = sorted(
+            (
+                (self.get_cost(pageNow, pageNext), pageNow, pageNext)
+                for pageNow, dictNext in self.dictSamples.items() for pageNext in dictNext
+            ),
+            reverse=True
+        )
+        return "\n".join(f"{pageNow} -> {pageNext}：{cost:.2f}s" for cost, pageNow, pageNext in listEdge)
+
+
+class RouteTable:
+    """
+    页面路径表，由页面模型字典构建页面转移图并预先计算所有页面间的最短路径
+    边的代价为实测切换耗时的中位数
+    """
+
+    def __init__(self, dictPages: dict, edgeStats: EdgeStats = None):
+        """
+        :param dictPages: 页面模型字典
+        :param edgeStats: 页面切换耗时统计，为空时所有边代价相同
+        """
+        self.edgeStats = edgeStats
+        self.version = None  # (页面模型字典id, 耗时统计版本)
+        self.signature = None  # 页面转移图签名，变化时重建路径表
+        self.dictGraph = {}  # 键为页面名，值为可直接到达的页面名列表
+        self.dictPath = {}  # 键为(起始页面名, 目标页面名)，值为路径界面名列表
+        self.dictCost = {}  # 键为(起始页面名, 目标页面名)，值为路径总代价
+        self.refresh(dictPages)
+
+    @staticmethod
+    def get_signature(dictPages: dict) -> tuple:
+        """
+        计算页面转移图签名
+        """
+        return tuple(
+            (pageName, tuple(modelPageRoute.pageName for modelPageRoute in modelPage.route))
+            for pageName, modelPage in dictPages.items()
+        )
+
+    def refresh(self, dictPages: dict) -> bool:
+        """
+        页面转移图变化时重建路径表
+        :param dictPages: 页面模型字典
+        :return: 是否重建
+        """
+        statsVersion = self.edgeStats.version if self.edgeStats else 0
+        version = (id(dictPages), statsVersion)
+        if version == self.version:  # 页面字典与耗时统计均未变化，无需重新计算签名
+            return False
+
+        boolStatsChanged = self.version is not None and self.version[1] != statsVersion
+        self.version = version
+        signature = self.get_signature(dictPages)
+        if signature == self.signature and not boolStatsChanged:
+            return False
+
+        self.signature = signature
+        self.dictGraph = {pageName: list(listNext) for pageName, listNext in signature}
+        self.dictPath = {}
+        self.dictCost = {}
+        for pageStart in self.dictGraph:
+            self.__dijkstra(pageStart)
+        return True
+
+    def get_edge_cost(self, pageNow: str, pageNext: str) -> float:
+        """
+        获取页面转移边的代价
+        """
+        return self.edgeStats.get_cost(pageNow, pageNext) if self.edgeStats else 1.0
+
+    def __dijkstra(self, pageStart: str):
+        """
+        搜索起始页面到其他所有页面的最短路径
+        """
+        dictParent = {pageStart: None}
+        dictDistance = {pageStart: 0.0}
+        listHeap = [(0.0, 0, pageStart)]
+        order = 1  # 代价相同时按入堆顺序出堆，保证结果稳定
+        while listHeap:
+            distance, _, pageName = heapq.heappop(listHeap)
+            if distance > dictDistance[pageName]:
+                continue
+
+            for pageNext in self.dictGraph.get(pageName, []):
+                distanceNext = distance + self.get_edge_cost(pageName, pageNext)
+                if pageNext not in dictDistance or distanceNext < dictDistance[pageNext]:
+                    dictDistance[pageNext] = distanceNext
+                    dictParent[pageNext] = pageName
+                    heapq.heappush(listHeap, (distanceNext, order, pageNext))
+                    order += 1
+
+        for pageTarget in dictParent:
+            route = []
+            pageName = pageTarget
+            while pageName is not None:
+                route.append(pageName)
+                pageName = dictParent[pageName]
+            route.reverse()
+            self.dictPath[(pageStart, pageTarget)] = route
+            self.dictCost[(pageStart, pageTarget)] = dictDistance[pageTarget]
+
+    def find_path(self, pageStart: str, pageTarget: str):
+        """
+        查询最短路径
+        :param pageStart: 起始页面名
+        :param pageTarget: 目标页面名
+        :return: 路径界面名列表，包含起止页面，无法到达时返回None
+        """
+        route = self.dictPath.get((pageStart, pageTarget))
+        return list(route) if route else None
+
+    def get_cost(self, pageStart: str, pageTarget: str):
+        """
+        查询最短路径的总代价
+        :param pageStart: 起始页面名
+        :param pageTarget: 目标页面名
+        :return: 总代价，无法到达时返回None
+        """
+        return self.dictCost.get((pageStart, pageTarget))
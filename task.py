@@ -1,6 +1,149 @@
-from page import listTask
+import json
+import time
 
+from constants import Setting
+from page import Page, dictTaskCls, get_dictPages
+from persist import write_atomic
+from route import EdgeStats, RouteTable
+from utils import logger
+from waiter import WaitTimeout
 
-class Task:
-    def __init__(self):
-        self.listTask = listTask
+
+class Scheduler:
+    """
+    任务调度器，记录每个任务的下次可执行时间，到期任务按页面路径代价排序后依次执行
+    """
+
+    def __init__(self, dictTask: dict = None, path: str = "config.json"):
+        """
+        :param dictTask: 键为任务名，值为任务类，任务类以base参数接收共用页面，默认为全部已注册任务
+        :param path: 配置文件路径，下次执行时间保存在其中的nextTime
+        """
+        self.dictTask = dictTaskCls if dictTask is None else dictTask
+        self.path = path
+        self.page = None  # 各任务共用的已初始化页面，首次执行任务时创建，任务失败后重建
+        self.dictPages = get_dictPages()
+        self.routeTable = None  # 页面路径表，排序时按最新的实测耗时重建
+        with open(self.path, 'r', encoding='utf-8') as file:
+            self.config = json.load(file)
+        self.dictNextTime = {
+            taskName: time.mktime(time.strptime(textTime, "%Y-%m-%d %H:%M:%S"))
+            for taskName, textTime in self.config.get('nextTime', {}).items()
+        }  # 键为任务名，值为下次可执行时间戳
+
+    def save(self):
+        """
+        将下次执行时间写入配置文件
+        """
+        self.config['nextTime'] = {
+            taskName: time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(timeNext))
+            for taskName, timeNext in self.dictNextTime.items()
+        }
+        data = json.dumps(self.config, indent=2, ensure_ascii=False)
+        write_atomic(self.path, data.encode('utf-8'))
+
+    def get_due(self, now: float = None) -> list:
+        """
+        获取已到期的任务
+        :param now: 当前时间戳
+        :return: 任务名列表
+        """
+        now = time.time() if now is None else now
+        return [taskName for taskName in self.dictTask if self.dictNextTime.get(taskName, 0) <= now]
+
+    def get_cost(self, pageStart: str, pageTarget: str) -> float:
+        """
+        两个界面间的导航代价，无法直接到达时经由主界面
+        """
+        if pageStart == pageTarget:
+            return 0.0
+
+        cost = self.routeTable.get_cost(pageStart, pageTarget)
+        if cost is None:  # 先返回主界面
+            costMain = self.routeTable.get_cost("主界面", pageTarget)
+            cost = Setting.defaultEdgeCost + (float("inf") if costMain is None else costMain)
+        return cost
+
+    def order(self, listTaskName: list, pageStart: str = "主界面") -> list:
+        """
+        安排任务顺序，使依次导航至各任务界面的总代价最小
+        任务不超过12个时动态规划求最优顺序，否则每次选择代价最小的下一任务
+        :param listTaskName: 任务名列表
+        :param pageStart: 起始界面名
+        :return: 排序后的任务名列表
+        """
+        self.routeTable = RouteTable(self.dictPages, EdgeStats())  # 读取最新的实测切换耗时
+        listPage = [self.dictTask[taskName].pageTask for taskName in listTaskName]
+        count = len(listPage)
+        if count > 12:
+            listOrder = []
+            listRest = list(range(count))
+            pageNow = pageStart
+            while listRest:
+                index = min(listRest, key=lambda i: self.get_cost(pageNow, listPage[i]))
+                listRest.remove(index)
+                listOrder.append(listTaskName[index])
+                pageNow = listPage[index]
+            return listOrder
+
+        # dictBest键为(已执行任务集合的位掩码, 最后执行的任务序号)，值为(总代价, 上一任务序号)
+        dictBest = {(1 << i, i): (self.get_cost(pageStart, listPage[i]), None) for i in range(count)}
+        for mask in range(1, 1 << count):
+            for last in range(count):
+                if (mask, last) not in dictBest:
+                    continue
+                cost = dictBest[(mask, last)][0]
+                for nextIndex in range(count):
+                    if mask & (1 << nextIndex):
+                        continue
+                    key = (mask | (1 << nextIndex), nextIndex)
+                    costNext = cost + self.get_cost(listPage[last], listPage[nextIndex])
+                    if key not in dictBest or costNext < dictBest[key][0]:
+                        dictBest[key] = (costNext, last)
+
+        if not count:
+            return []
+
+        mask = (1 << count) - 1
+        last = min(range(count), key=lambda i: dictBest[(mask, i)][0])
+        listOrder = []
+        while last is not None:
+            listOrder.append(listTaskName[last])
+            mask, last = mask & ~(1 << last), dictBest[(mask, last)][1]
+        listOrder.reverse()
+        return listOrder
+
+    def run_once(self) -> int:
+        """
+        执行所有到期任务
+        :return: 执行的任务数
+        """
+        listOrder = self.order(self.get_due())
+        logger(f"任务顺序：{listOrder}")
+        for taskName in listOrder:
+            try:
+                if self.page is None:
+                    self.page = Page()  # 查找窗口、检测分辨率等初始化只执行一次
+                task = self.dictTask[taskName](base=self.page)
+                task.run()
+                delay = Setting.intervalTask if task.delay is None else task.delay
+            except WaitTimeout as e:  # 界面长时间未响应，窗口仍可用，稍后重试
+                logger(f"任务{taskName}等待超时：{e}")
+                delay = Setting.intervalRetry
+            except Exception as e:  # 单个任务失败不影响其他任务
+                logger(f"任务{taskName}执行失败：{e}")
+                delay = Setting.intervalRetry
+                self.page = None  # 窗口或截图可能已失效，下一任务重新初始化
+
+            self.dictNextTime[taskName] = time.time() + delay
+            self.save()
+        return len(listOrder)
+
+    def run_forever(self):
+        """
+        循环执行到期任务，没有到期任务时休眠至最早的下次执行时间
+        """
+        while True:
+            self.run_once()
+            timeNext = min(self.dictNextTime.get(taskName, 0) for taskName in self.dictTask)
+            time.sleep(max(timeNext - time.time(), 1))
@@ -0,0 +1,240 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+from capture import Frame
+from constants import Setting
+from geometry import Rect
+from utils import logger
+
+
+class Template:
+    """
+    按当前分辨率缩放后的模板图片
+    """
+
+    def __init__(self, name: str, gray: np.ndarray, level: int = None):
+        """
+        :param name: 模板图片名
+        :param gray: 缩放后的灰度图
+        :param level: 粗匹配的金字塔层数
+        """
+        self.name = name
+        self.gray = gray
+        self.height, self.width = gray.shape
+        self.level = Setting.pyramidLevel if level is None else level
+        self.coarse = None  # 粗匹配用的缩小灰度图，模板过小时为空
+        ratio = 1 / 2 ** self.level
+        if self.level and min(self.height, self.width) * ratio >= 8:
+            self.coarse = cv2.resize(gray, None, fx=ratio, fy=ratio, interpolation=cv2.INTER_AREA)
+
+
+def match_exhaustive(gray: np.ndarray, imgTemplate: np.ndarray) -> tuple:
+    """
+    全图模板匹配
+    :param gray: 灰度图
+    :param imgTemplate: 灰度模板
+    :return: (相关系数, x, y)，图比模板小时相关系数为-1
+    """
+    if gray.shape[0] < imgTemplate.shape[0] or gray.shape[1] < imgTemplate.shape[1]:
+        return -1.0, 0, 0
+
+    res = cv2.matchTemplate(gray, imgTemplate, cv2.TM_CCOEFF_NORMED)
+    _, confidence, _, (x, y) = cv2.minMaxLoc(res)
+    return confidence, x, y
+
+
+def match_pyramid(frame: Frame, template: Template) -> tuple:
+    """
+    金字塔模板匹配，先在缩小的画面中粗匹配，再在全分辨率下于峰值附近的小窗口内精确匹配
+    粗匹配远低于阈值时直接判定未找到，只有粗匹配接近阈值而精确匹配未达到阈值时才退回全图匹配
+    :param frame: 截图帧
+    :param template: 模板
+    :return: (相关系数, x, y)，坐标为整个画面中的坐标
+    """
+    if template.coarse is not None:
+        confidence, x, y = match_exhaustive(frame.pyramid(template.level), template.coarse)
+        scale = 2 ** template.level
+        if confidence < Setting.threshold - Setting.pyramidSlack:  # 模板不在画面中，无需精确匹配
+            return confidence, frame.x + x * scale, frame.y + y * scale
+
+        # 粗匹配坐标误差不超过一个缩小像素，窗口向四周各扩展两个缩小像素
+        margin = scale * 2
+        window = frame.crop(Rect(
+            frame.x + x * scale - margin,
+            frame.y + y * scale - margin,
+            frame.x + x * scale + template.width + margin,
+            frame.y + y * scale + template.height + margin
+        ))
+        confidence, x, y = match_exhaustive(window.gray, template.gray)
+        if confidence >= Setting.threshold:
+            return confidence, window.x + x, window.y + y
+
+    confidence, x, y = match_exhaustive(frame.gray, template.gray)
+    return confidence, frame.x + x, frame.y + y
+
+
+executorMatch = ThreadPoolExecutor(max_workers=min(8, os.cpu_count() or 1))  # matchTemplate会释放GIL，可用线程并行
+
+
+def match_many(frame: Frame, listName: list, listRegion: list = None) -> list:
+    """
+    在同一帧中并行匹配多个模板
+    :param frame: 截图帧
+    :param listName: 模板图片名列表，不存在的模板图片跳过
+    :param listRegion: 与模板图片名一一对应的区域位置模型列表，为空或元素为空时匹配整个画面
+    :return: (模板图片名, 相关系数, 位置模型)列表，只包含达到阈值的匹配，顺序与模板图片名列表一致
+    """
+    listRegion = listRegion or [None] * len(listName)
+    listTask = [
+        (template, region) for template, region in
+        zip((templateStore.get(name) for name in listName), listRegion) if template
+    ]
+
+    # 在调用线程中预先完成通道转换与缩小，工作线程只读取，避免同一视图被多个线程重复计算
+    frame.gray  # 全图匹配与区域帧共用整帧灰度图
+    listFrame = [frame if region is None else frame.crop(region) for _, region in listTask]
+    for (template, _), frameTask in zip(listTask, listFrame):
+        frameTask.gray
+        if template.coarse is not None:
+            frameTask.pyramid(template.level)
+
+    listFuture = [
+        executorMatch.submit(match_pyramid, frameTask, template)
+        for (template, _), frameTask in zip(listTask, listFrame)
+    ]
+
+    listReturn = []
+    for (template, _), future in zip(listTask, listFuture):
+        confidence, x, y = future.result()
+        if confidence >= Setting.threshold:
+            pos = Rect(x, y, x + template.width, y + template.height)
+            listReturn.append((template.name, confidence, pos))
+    return listReturn
+
+
+class PositionCache:
+    """
+    模板位置缓存，只在缓存位置附近的小窗口内验证模板，验证失败时作废并全图重新搜索
+    """
+
+    def __init__(self, dictPos: dict = None, margin: int = None):
+        """
+        :param dictPos: 键为模板图片名，值为已记录的位置模型
+        :param margin: 验证窗口向四周扩展的像素数
+        """
+        self.dictPos = dict(dictPos or {})
+        self.margin = Setting.verifyMargin if margin is None else margin
+        self.hits = 0  # 验证成功次数
+        self.misses = 0  # 无缓存位置的次数
+        self.invalidations = 0  # 验证失败后作废的次数
+
+    def get_window(self, name: str):
+        """
+        获取缓存位置的验证窗口
+        :param name: 模板图片名
+        :return: 位置模型，无缓存位置时返回None
+        """
+        pos = self.dictPos.get(name)
+        if pos is None:
+            return None
+
+        return Rect(max(pos.x1 - self.margin, 0), max(pos.y1 - self.margin, 0), pos.x2 + self.margin, pos.y2 + self.margin)
+
+    def verify(self, frame: Frame, template: Template):
+        """
+        在验证窗口内匹配模板
+        :param frame: 验证窗口的截图帧
+        :param template: 模板
+        :return: 位置模型，验证失败时作废缓存位置并返回None
+        """
+        confidence, x, y = match_exhaustive(frame.gray, template.gray)
+        if confidence < Setting.threshold:
+            self.invalidations += 1
+            self.dictPos.pop(template.name, None)
+            return None
+
+        self.hits += 1
+        pos = Rect(frame.x + x, frame.y + y, frame.x + x + template.width, frame.y + y + template.height)
+        self.dictPos[template.name] = pos
+        return pos
+
+    def search(self, frame: Frame, template: Template):
+        """
+        全图搜索模板并缓存位置
+        :param frame: 整个画面的截图帧
+        :param template: 模板
+        :return: 位置模型，未找到时返回None
+        """
+        self.misses += 1
+        confidence, x, y = match_pyramid(frame, template)
+        if confidence < Setting.threshold:
+            return None
+
+        pos = Rect(x, y, x + template.width, y + template.height)
+        self.dictPos[template.name] = pos
+        return pos
+
+    def __str__(self):
+        total = self.hits + self.misses + self.invalidations
+        rate = self.hits / total if total else 0
+        return f"模板位置缓存 命中：{self.hits}，未命中：{self.misses}，作废：{self.invalidations}，命中率：{rate:.2%}"
+
+
+class TemplateStore:
+    """
+    模板图片仓库，启动时一次性读取所有模板并按当前分辨率缩放，分辨率变化时重新缩放
+    """
+
+    def __init__(self, dictPath: dict = None, widthBase: int = 3840):
+        """
+        :param dictPath: 键为模板图片名，值为图片路径，默认为Setting.dictTemplatePath
+        :param widthBase: 模板图片截取时的屏幕宽度
+        """
+        self.dictPath = Setting.dictTemplatePath if dictPath is None else dictPath
+        self.widthBase = widthBase
+        self.dictSource = {}  # 键为模板图片名，值为原始灰度图
+        self.dictTemplate = {}  # 键为模板图片名，值为缩放后的模板
+        self.width = None  # 缩放时的屏幕宽度
+
+    def load(self):
+        """
+        读取所有模板图片，已读取的不再重复读取
+        """
+        for name, path in self.dictPath.items():
+            if name in self.dictSource:
+                continue
+
+            if not os.path.exists(path):
+                logger(f"模板图片不存在：{name}（{path}）")
+                continue
+
+            self.dictSource[name] = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+
+        self.__scale()
+
+    def __scale(self):
+        """
+        按当前屏幕宽度缩放所有模板
+        """
+        self.width = Setting.screenWidth
+        ratio = self.width / self.widthBase
+        self.dictTemplate = {
+            name: Template(name, cv2.resize(gray, None, fx=ratio, fy=ratio, interpolation=cv2.INTER_AREA))
+            for name, gray in self.dictSource.items()
+        }
+
+    def get(self, name: str):
+        """
+        获取模板
+        :param name: 模板图片名
+        :return: 模板，图片不存在时返回None
+        """
+        if self.width != Setting.screenWidth:  # 首次使用或分辨率已变化
+            self.load()
+        return self.dictTemplate.get(name)
+
+
+templateStore = TemplateStore()
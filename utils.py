@@ -1,11 +1,37 @@
+import threading
 import time
 from pydantic import BaseModel, Field
 
-from rapidocr_openvino import RapidOCR
-ocr = RapidOCR(
-    min_height=210,
-    det_limit_side_len=40,
-)
+ocrEngine = None  # OCR引擎，首次使用时创建
+lockOCR = threading.Lock()
+
+
+def get_ocr():
+    """
+    获取OCR引擎，首次调用时加载模型
+    :return: RapidOCR对象
+    """
+    global ocrEngine
+    if ocrEngine is None:
+        with lockOCR:
+            if ocrEngine is None:
+                from rapidocr_openvino import RapidOCR  # 模型加载耗时数秒，推迟到首次使用
+
+                ocrEngine = RapidOCR(
+                    min_height=210,
+                    det_limit_side_len=40,
+                )
+    return ocrEngine
+
+
+def warmup_ocr() -> threading.Thread:
+    """
+    在后台线程中预先加载OCR引擎
+    :return: 加载线程
+    """
+    thread = threading.Thread(target=get_ocr, daemon=True)
+    thread.start()
+    return thread
 
 
 class PositionModel(BaseModel):
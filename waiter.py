@@ -0,0 +1,65 @@
+import time
+
+from constants import Setting
+
+
+class WaitTimeout(Exception):
+    """
+    等待超时异常
+    """
+    pass
+
+
+class Waiter:
+    """
+    自适应轮询等待，刚操作过时快速轮询，画面长时间无变化时逐渐放慢，超过期限抛出异常
+    """
+
+    def __init__(self, getTimeAction=None, intervalMin: float = None, intervalMax: float = None, factor: float = None):
+        """
+        :param getTimeAction: 返回最近一次点击等操作时间戳的函数
+        :param intervalMin: 最短轮询间隔（秒）
+        :param intervalMax: 最长轮询间隔（秒）
+        :param factor: 每次未满足条件后轮询间隔的增长倍数
+        """
+        self.getTimeAction = getTimeAction or (lambda: 0.0)
+        self.intervalMin = Setting.pollIntervalMin if intervalMin is None else intervalMin
+        self.intervalMax = Setting.pollIntervalMax if intervalMax is None else intervalMax
+        self.factor = Setting.pollFactor if factor is None else factor
+        self.polls = 0  # 轮询次数
+        self.timeSleep = 0.0  # 累计休眠时间
+
+    def wait(self, predicate, timeout: float = None, description: str = "", attempts: int = 0):
+        """
+        轮询直到条件满足
+        :param predicate: 条件函数，返回真值时结束等待
+        :param timeout: 超时时间（秒），为空时使用Setting.timeoutWait，为0时不限时
+        :param description: 超时异常中的等待描述
+        :param attempts: 最少尝试次数，条件函数本身耗时较长时保证超时前至少判断这么多次
+        :return: 条件函数的返回值
+        :raise WaitTimeout: 超过期限且已达到最少尝试次数时抛出
+        """
+        timeout = Setting.timeoutWait if timeout is None else timeout
+        deadline = time.time() + timeout if timeout else None
+        interval = self.intervalMin
+        timeAction = self.getTimeAction()
+        count = 0  # 本次等待的尝试次数
+        while True:
+            result = predicate()
+            self.polls += 1
+            count += 1
+            if result:
+                return result
+
+            now = time.time()
+            if deadline and now >= deadline and count >= attempts:
+                raise WaitTimeout(f"等待超时（{timeout}s）：{description}")
+
+            if self.getTimeAction() != timeAction:  # 期间有新的操作，恢复快速轮询
+                timeAction = self.getTimeAction()
+                interval = self.intervalMin
+
+            sleep = min(interval, deadline - now) if deadline and now < deadline else interval  # 期限已过但尝试次数不足时按间隔重试
+            time.sleep(sleep)
+            self.timeSleep += sleep
+            interval = min(interval * self.factor, self.intervalMax)